@@ -0,0 +1,152 @@
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+# Make the application packages (core, database) importable from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "app"))
+
+DEFAULT_CHECKPOINT = ".cache/backfill_emotions.json"
+
+def score_texts(texts):
+    """
+    Scores texts with the emotion model.
+
+    Runs in the worker processes as well; each one loads the model once on first use.
+
+    Returns:
+        tuple[np.ndarray, list[str]]: Percentages per text and emotion, and the emotion labels.
+    """
+    from core.emotions import get_emotions, get_model, prepare_texts
+
+    return get_model().predict_proba(prepare_texts(texts)) * 100, [str(label) for label in get_emotions()]
+
+def to_rows(batch, probabilities, labels):
+    """Converts a scored batch into `message_emotions` rows."""
+    from database.db import EMOTION_COLUMNS
+
+    if set(labels) != set(EMOTION_COLUMNS):
+        raise ValueError(f"Model labels {labels} do not match the message_emotions columns {list(EMOTION_COLUMNS)}")
+
+    rows = []
+    for (message_id, _), row in zip(batch, probabilities):
+        scores = dict(zip(labels, row.tolist()))
+        rows.append({"message_id": message_id, **scores, "dominant": max(scores, key=scores.get)})
+    return rows
+
+def load_checkpoint(path):
+    """Returns the saved checkpoint, or a fresh one if there is none."""
+    path = Path(path)
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"last_id": 0, "scored": 0}
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint atomically, so an interrupted run never leaves a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint))
+    tmp.replace(path)
+
+def backfill(checkpoint_path=DEFAULT_CHECKPOINT, batch_size=1000, workers=0, limit=None):
+    """
+    Scores stored user messages and writes the results to the `message_emotions` table.
+
+    Messages are read in id order one batch at a time and the id of the last stored batch is
+    checkpointed after every commit, so an interrupted run resumes where it stopped and memory
+    stays bounded by the number of batches in flight.
+
+    Args:
+        checkpoint_path (str, optional): JSON checkpoint file. Defaults to `DEFAULT_CHECKPOINT`.
+        batch_size (int, optional): Messages per batch. Defaults to 1000.
+        workers (int, optional): Scoring processes; `0` scores in this process. Defaults to 0.
+        limit (int, optional): Stop after this many messages.
+
+    Returns:
+        dict: The final checkpoint.
+    """
+    from database.db import iter_message_batches, save_message_emotions
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    start, scored = time.perf_counter(), 0
+
+    def store(batch, probabilities, labels):
+        nonlocal scored
+        save_message_emotions(to_rows(batch, probabilities, labels))
+        scored += len(batch)
+        checkpoint["last_id"] = batch[-1][0]
+        checkpoint["scored"] += len(batch)
+        save_checkpoint(checkpoint_path, checkpoint)
+        rate = scored / (time.perf_counter() - start)
+        print(f"Scored {checkpoint['scored']} messages (last id {checkpoint['last_id']}, {rate:.0f} msg/s)")
+
+    batches = iter_message_batches(after_id=checkpoint["last_id"], batch_size=batch_size)
+    if limit:
+        batches = _limit(batches, limit)
+
+    if not workers:
+        for batch in batches:
+            store(batch, *score_texts(content for _, content in batch))
+        return checkpoint
+
+    # Keep a bounded number of batches in flight and store them in order, so the checkpoint only moves forward
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(score_texts, [content for _, content in batch])))
+            if len(pending) >= workers * 2:
+                batch, future = pending.popleft()
+                store(batch, *future.result())
+        while pending:
+            batch, future = pending.popleft()
+            store(batch, *future.result())
+    return checkpoint
+
+def _limit(batches, limit):
+    """Truncates a stream of batches after `limit` rows."""
+    for batch in batches:
+        if limit <= 0:
+            return
+        yield batch[:limit]
+        limit -= len(batch)
+
+def report():
+    """Prints aggregate emotion statistics of the scored messages."""
+    from database.db import get_emotion_stats
+
+    stats = get_emotion_stats()
+    print(f"Scored messages: {stats['count']}")
+    for name, value in stats["average"].items():
+        print(f"  {name:<10} avg {value:6.2f}%  dominant in {stats['dominant'].get(name, 0)} messages")
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill per-message emotion scores into the message_emotions table.")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="JSON file holding the last scored message id.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Messages read and scored per batch.")
+    parser.add_argument("--workers", type=int, default=0, help="Scoring processes (0 scores in-process).")
+    parser.add_argument("--limit", type=int, help="Stop after this many messages.")
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and rescore every message.")
+    parser.add_argument("--report", action="store_true", help="Only print aggregate emotion statistics.")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    from database.db import init_db  # Imported after load_dotenv() so DATABASE_URL is set
+
+    init_db()
+    if args.report:
+        report()
+        sys.exit(0)
+
+    if args.reset:
+        Path(args.checkpoint).unlink(missing_ok=True)
+    checkpoint = backfill(args.checkpoint, args.batch_size, args.workers, args.limit)
+    print(f"Done! {checkpoint['scored']} messages scored, last id {checkpoint['last_id']}.")
+    report()
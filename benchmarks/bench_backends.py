@@ -0,0 +1,66 @@
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from common import ROOT, summarize, time_calls, format_row
+from core.emotions import load_model
+from core.preprocessing import clean_text
+from core.onnx_backend import OnnxEmotionModel
+
+def concurrent_latency(predict, messages, threads):
+    """Scores every message as its own request from `threads` concurrent callers and returns per-request latencies."""
+    def call(message):
+        start = time.perf_counter()
+        predict([message])
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        samples = list(pool.map(call, messages))
+    return samples, len(messages) / (time.perf_counter() - start)
+
+def batch_throughput(predict, messages, batch_size):
+    """Returns messages scored per second when scoring in batches of `batch_size`."""
+    start = time.perf_counter()
+    for i in range(0, len(messages), batch_size):
+        predict(messages[i:i + batch_size])
+    return len(messages) / (time.perf_counter() - start)
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the TF-IDF pipeline with the ONNX transformer backend on CPU.")
+    parser.add_argument("--sklearn", default=str(ROOT / "models" / "text_emotion.pkl"), help="TF-IDF model (.pkl, .joblib or .npz).")
+    parser.add_argument("--onnx", default=str(ROOT / "models" / "bert-emotion-onnx"), help="Exported ONNX model directory or file.")
+    parser.add_argument("--dataset", default=str(ROOT / "models" / "dataset" / "emotion_dataset_raw.csv"))
+    parser.add_argument("--samples", type=int, default=500, help="Messages per measurement.")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers in the micro-batching run.")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Per-message p95 latency budget.")
+    args = parser.parse_args()
+
+    messages = pd.read_csv(args.dataset)['Text'].astype(str).tolist()[:args.samples]
+
+    pipeline = load_model(args.sklearn)
+    sklearn_predict = lambda texts: pipeline.predict_proba([clean_text(text) for text in texts])
+    onnx_direct = OnnxEmotionModel(args.onnx, max_wait_ms=0)
+    onnx_batched = OnnxEmotionModel(args.onnx)
+    print(f"ONNX model: {onnx_direct.model_file}")
+
+    rows = {
+        "tfidf single": summarize(time_calls(lambda m: sklearn_predict([m]), messages)),
+        "onnx single": summarize(time_calls(lambda m: onnx_direct.predict_proba([m]), messages)),
+    }
+    samples, rate = concurrent_latency(onnx_direct.predict_proba, messages, args.threads)
+    rows[f"onnx {args.threads} callers"] = summarize(samples)
+    samples, batched_rate = concurrent_latency(onnx_batched.predict_proba, messages, args.threads)
+    rows[f"onnx {args.threads} callers batched"] = summarize(samples)
+
+    for name, stats in rows.items():
+        print(format_row(name, stats))
+
+    print(f"Throughput, {args.threads} concurrent callers: {rate:.0f} msg/s unbatched, {batched_rate:.0f} msg/s micro-batched")
+    print(f"Throughput, batches of 32: tfidf {batch_throughput(sklearn_predict, messages, 32):.0f} msg/s, onnx {batch_throughput(onnx_direct.predict_proba, messages, 32):.0f} msg/s")
+
+    p95 = rows["onnx single"]["p95_ms"]
+    print(f"ONNX single-message p95 {p95:.2f} ms is {'within' if p95 <= args.budget_ms else 'OVER'} the {args.budget_ms:.0f} ms budget")
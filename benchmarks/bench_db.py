@@ -0,0 +1,112 @@
+import os
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from common import summarize, time_calls, format_row, peak_memory, write_report
+
+MESSAGES_PER_CHAT = 20
+CHATS_PER_SESSION = 10
+SEED_BATCH = 10000
+
+def seed(db, chats, messages, start):
+    """
+    Bulk-inserts chats of `MESSAGES_PER_CHAT` alternating user/assistant messages.
+
+    Args:
+        db (module): The `database.db` module.
+        chats (int): Chats already stored; new chats continue their numbering.
+        messages (int): Number of messages to add.
+        start (datetime): Timestamp of the first stored message.
+
+    Returns:
+        int: Number of chats stored afterwards.
+    """
+    new_chats = messages // MESSAGES_PER_CHAT
+    with db.engine.begin() as connection:
+        for offset in range(0, new_chats, SEED_BATCH // MESSAGES_PER_CHAT):
+            chat_rows, message_rows = [], []
+            for n in range(chats + offset, chats + min(new_chats, offset + SEED_BATCH // MESSAGES_PER_CHAT)):
+                at = start + timedelta(minutes=n)
+                chat_rows.append({"id": n + 1, "session_id": f"session-{n // CHATS_PER_SESSION}", "created_at": at, "last_message_at": at, "deleted": False})
+                for i in range(MESSAGES_PER_CHAT):
+                    role = "user" if i % 2 == 0 else "assistant"
+                    message_rows.append({"chat_id": n + 1, "role": role, "content": f"{role} message {i} of chat {n + 1}", "timestamp": at + timedelta(seconds=i)})
+            connection.execute(db.insert(db.Chat), chat_rows)
+            connection.execute(db.insert(db.Message), message_rows)
+    return chats + new_chats
+
+def time_cold(db, fn, inputs):
+    """Times `fn` once per input, clearing the read caches (untimed) before every call."""
+    samples = []
+    for value in inputs:
+        db.clear_cache()
+        samples.extend(time_calls(fn, [value], warmup=0))
+    return samples
+
+def run(sizes=(1000, 10000, 100000, 1000000), samples=200):
+    """
+    Measures the `database.db` helpers as the messages table grows.
+
+    The database is filled up to each size in turn (`MESSAGES_PER_CHAT` messages per chat,
+    `CHATS_PER_SESSION` chats per session). Reads are timed cold, with the in-process caches
+    cleared, and warm; writes go through `save_exchange` on random chats.
+
+    Args:
+        sizes (tuple[int], optional): Message counts measured, ascending.
+        samples (int, optional): Calls timed per helper and size.
+
+    Returns:
+        dict: Per-size latency summaries and peak traced memory of a read pass.
+    """
+    from database import db
+
+    db.init_db()
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=365 * 3)
+    chats = 0
+    results = {"database": db.engine.url.render_as_string(hide_password=True)}
+
+    for size in sizes:
+        chats = seed(db, chats, size - chats * MESSAGES_PER_CHAT, start)
+        chat_ids = [rng.randint(1, chats) for _ in range(samples)]
+        sessions = [f"session-{(chat_id - 1) // CHATS_PER_SESSION}" for chat_id in chat_ids]
+
+        stats = {
+            "get_recent_chats_cold": summarize(time_cold(db, db.get_recent_chats, sessions)),
+            "get_recent_chats_warm": summarize(time_calls(db.get_recent_chats, sessions, warmup=samples)),
+            "get_chat_messages_page_cold": summarize(time_cold(db, db.get_chat_messages_page, chat_ids)),
+            "get_chat_messages_page_warm": summarize(time_calls(db.get_chat_messages_page, chat_ids, warmup=samples)),
+            "get_chat_title_cold": summarize(time_cold(db, db.get_chat_title, chat_ids)),
+            "save_exchange": summarize(time_calls(lambda chat_id: db.save_exchange(chat_id, "How are you?", "I am fine."), chat_ids, warmup=0)),
+        }
+
+        def read_pass():
+            db.clear_cache()
+            for chat_id, session_id in zip(chat_ids, sessions):
+                db.get_recent_chats(session_id)
+                db.get_chat_messages_page(chat_id)
+
+        _, stats["peak_traced_mb"] = peak_memory(read_pass)
+        results[str(size)] = stats
+
+        print(f"{size} messages")
+        for name, row in stats.items():
+            if isinstance(row, dict):
+                print("  " + format_row(name, row))
+
+    return results
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the database helpers at growing table sizes.")
+    parser.add_argument("--database-url", help="Database to fill; an empty temporary SQLite file when omitted. Use an empty database, rows are added to it.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="Message counts measured, ascending.")
+    parser.add_argument("--samples", type=int, default=200, help="Calls timed per helper and size.")
+    parser.add_argument("--output", help="JSON report file (printed when omitted).")
+    args = parser.parse_args()
+
+    # database.db reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    write_report({"db": run(sorted(args.sizes), args.samples)}, args.output)
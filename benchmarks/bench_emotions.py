@@ -0,0 +1,58 @@
+import time
+import argparse
+
+import pandas as pd
+
+from common import ROOT, summarize, time_calls, format_row, peak_memory, write_report
+
+def run(messages, batch_sizes=(1, 8, 32, 128)):
+    """
+    Measures `core.emotions` scoring.
+
+    Single-message latency is measured with a cold prediction cache (every message distinct)
+    and a warm one (the same messages again). Batched throughput goes through
+    `get_prediction_proba_batch` with the cache cleared before every batch size.
+
+    Args:
+        messages (list[str]): Distinct messages to score.
+        batch_sizes (tuple[int], optional): Batch sizes measured.
+
+    Returns:
+        dict: Latency summaries, throughputs and peak traced memory.
+    """
+    from core.emotions import get_model, get_prediction_proba, get_prediction_proba_batch, prediction_cache
+
+    start = time.perf_counter()
+    get_model()
+    results = {"model_load_s": time.perf_counter() - start}
+
+    prediction_cache.clear()
+    results["single_cold"] = summarize(time_calls(get_prediction_proba, messages, warmup=0))
+    results["single_warm"] = summarize(time_calls(get_prediction_proba, messages, warmup=0))
+
+    results["batched"] = {}
+    for size in batch_sizes:
+        prediction_cache.clear()
+        batches = [messages[i:i + size] for i in range(0, len(messages), size)]
+        samples = time_calls(get_prediction_proba_batch, batches, warmup=0)
+        stats = summarize(samples)
+        stats["messages_per_s"] = len(messages) / sum(samples)
+        results["batched"][str(size)] = stats
+
+    prediction_cache.clear()
+    _, results["peak_traced_mb"] = peak_memory(get_prediction_proba_batch, messages)
+    return results
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark emotion scoring (single and batched).")
+    parser.add_argument("--dataset", default=str(ROOT / "models" / "dataset" / "emotion_dataset_raw.csv"))
+    parser.add_argument("--samples", type=int, default=2000, help="Distinct messages scored.")
+    parser.add_argument("--output", help="JSON report file (printed when omitted).")
+    args = parser.parse_args()
+
+    messages = list(dict.fromkeys(pd.read_csv(args.dataset)['Text'].astype(str)))[:args.samples]
+    results = run(messages)
+    print(format_row("get_prediction_proba cold", results["single_cold"]))
+    print(format_row("get_prediction_proba warm", results["single_warm"]))
+    write_report({"emotions": results}, args.output)
@@ -0,0 +1,28 @@
+import argparse
+
+import pandas as pd
+
+from common import ROOT, summarize, time_calls, format_row
+from core.preprocessing import clean_text, lemmatize, get_lemmas
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the serving-side cost of core.preprocessing.clean_text.")
+    parser.add_argument("--dataset", default=str(ROOT / "models" / "dataset" / "emotion_dataset_raw.csv"))
+    parser.add_argument("--samples", type=int, default=5000, help="Number of messages cleaned one at a time.")
+    args = parser.parse_args()
+
+    messages = pd.read_csv(args.dataset)['Text'].astype(str).tolist()[:args.samples]
+    print(f"Lemma table entries: {len(get_lemmas())}")
+
+    # Cold: empty lemma memo, every token looked up in the table once
+    lemmatize.cache_clear()
+    cold = summarize(time_calls(clean_text, messages, warmup=0))
+    print(format_row("clean_text (cold memo)", cold))
+
+    warm = summarize(time_calls(clean_text, messages))
+    print(format_row("clean_text (warm memo)", warm))
+
+    budget_ms = 1.0
+    verdict = "within" if warm["p99_ms"] < budget_ms else "OVER"
+    print(f"p99 {warm['p99_ms']:.3f} ms is {verdict} the {budget_ms:.0f} ms per-message budget")
@@ -0,0 +1,88 @@
+import os
+import time
+import argparse
+
+from common import summarize, format_row, peak_memory, write_report
+from fake_gemini import FakeGeminiConfig, start_server
+
+MESSAGES = [
+    "I can't stop worrying about my exams next week",
+    "Today was honestly a great day, I finally finished my project",
+    "I feel so alone since my best friend moved away",
+    "Why does everyone ignore what I say, it makes me furious",
+]
+
+def time_stream(stream):
+    """
+    Consumes a stream of text chunks.
+
+    Returns:
+        tuple: Seconds until the first non-empty chunk and until the stream ended.
+    """
+    start = time.perf_counter()
+    first = None
+    for chunk in stream:
+        if first is None and chunk:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def run(samples=50, first_token_delay=0.0, tokens_per_second=100000.0, reply_tokens=120, tokens_per_chunk=8):
+    """
+    Measures the streaming overhead of `LLM.reply` against a local fake Gemini server.
+
+    Every sample streams one first-turn reply through a new `LLM`; the baseline streams the
+    same prompt through a bare Gemini chat session. The difference between the two is the
+    cost of emotion scoring, prompt building and stream assembly. Must run before
+    `core.llm_response` is imported elsewhere, since it points the Gemini client at the server.
+
+    Args:
+        samples (int, optional): Replies streamed per measurement.
+        first_token_delay (float, optional): Server delay before the first chunk, in seconds.
+        tokens_per_second (float, optional): Server generation speed.
+        reply_tokens (int, optional): Words per reply.
+        tokens_per_chunk (int, optional): Words per streamed chunk.
+
+    Returns:
+        dict: TTFT and total latency summaries for the baseline and `LLM.reply`, and peak traced memory of a reply.
+    """
+    config = FakeGeminiConfig(first_token_delay=first_token_delay, tokens_per_second=tokens_per_second, reply_tokens=reply_tokens, tokens_per_chunk=tokens_per_chunk)
+    server = start_server(config)
+    os.environ.update(GEMINI_TRANSPORT="rest", GEMINI_API_ENDPOINT=f"http://127.0.0.1:{server.server_port}", RESPONSE_CACHE="off")
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+    from core.llm_response import LLM, get_generative_model
+
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(samples)]
+    model = get_generative_model("chat")
+    LLM().reply(messages[0]).__next__()  # Warms up the model, the HTTP client and the prediction cache
+
+    def baseline(message):
+        return (chunk.text for chunk in model.start_chat().send_message(message, stream=True))
+
+    try:
+        results = {"server": {"first_token_delay_s": first_token_delay, "tokens_per_second": tokens_per_second, "reply_tokens": reply_tokens}}
+        for name, stream in (("gemini_stream", baseline), ("llm_reply", lambda message: LLM().reply(message))):
+            ttft, total = zip(*(time_stream(stream(message)) for message in messages))
+            results[name] = {"ttft": summarize(ttft), "total": summarize(total)}
+
+        results["overhead_p50_ms"] = results["llm_reply"]["total"]["p50_ms"] - results["gemini_stream"]["total"]["p50_ms"]
+        _, results["peak_traced_mb"] = peak_memory(lambda: time_stream(LLM().reply(messages[0])))
+    finally:
+        server.shutdown()
+    return results
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark LLM.reply streaming overhead against a local fake Gemini server.")
+    parser.add_argument("--samples", type=int, default=50, help="Replies streamed per measurement.")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="Server delay before the first chunk, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=100000.0)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--output", help="JSON report file (printed when omitted).")
+    args = parser.parse_args()
+
+    results = run(args.samples, args.first_token_delay, args.tokens_per_second, args.reply_tokens)
+    for name in ("gemini_stream", "llm_reply"):
+        print(format_row(f"{name} ttft", results[name]["ttft"]))
+        print(format_row(f"{name} total", results[name]["total"]))
+    write_report({"reply": results}, args.output)
@@ -0,0 +1,36 @@
+import time
+import pickle
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common import ROOT, summarize, time_calls, format_row
+from core.scorer import CompiledScorer
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the pickled pipeline with the compiled NumPy scorer.")
+    parser.add_argument("--pickle", default=str(ROOT / "models" / "text_emotion.pkl"))
+    parser.add_argument("--compiled", default=str(ROOT / "models" / "text_emotion.npz"))
+    parser.add_argument("--dataset", default=str(ROOT / "models" / "dataset" / "emotion_dataset_raw.csv"))
+    parser.add_argument("--samples", type=int, default=2000, help="Number of messages scored one at a time.")
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.dataset)['Text'].astype(str).tolist()
+    messages = texts[:args.samples]
+
+    start = time.perf_counter()
+    with open(args.pickle, "rb") as file:
+        pipeline = pickle.load(file)
+    print(f"Pickle load: {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    scorer = CompiledScorer.load(args.compiled)
+    print(f"Compiled load: {time.perf_counter() - start:.3f} s")
+
+    error = np.abs(scorer.predict_proba(texts) - pipeline.predict_proba(texts)).max()
+    print(f"Max abs probability difference over {len(texts)} texts: {error:.2e}")
+
+    print(format_row("pipeline.predict_proba", summarize(time_calls(lambda m: pipeline.predict_proba([m]), messages))))
+    print(format_row("scorer.predict_proba", summarize(time_calls(lambda m: scorer.predict_proba([m]), messages))))
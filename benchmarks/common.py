@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+import tracemalloc
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Make the application packages (core, database) importable from the benchmarks
+sys.path.insert(0, str(ROOT / "src" / "app"))
+
+def summarize(samples):
+    """
+    Summarizes latency samples.
+
+    Args:
+        samples (list[float]): Latencies in seconds.
+
+    Returns:
+        dict: Sample count plus mean, p50, p95 and p99 latencies in milliseconds.
+    """
+    ms = np.asarray(samples) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+def time_calls(fn, inputs, warmup=10):
+    """
+    Times `fn` once per input.
+
+    Args:
+        fn (callable): Function under test, called with a single argument.
+        inputs (list): Arguments to call `fn` with.
+        warmup (int, optional): Number of leading inputs called before timing starts. Defaults to 10.
+
+    Returns:
+        list[float]: Per-call latencies in seconds.
+    """
+    for value in inputs[:warmup]:
+        fn(value)
+
+    samples = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def format_row(name, stats):
+    """Formats a `summarize` result as one aligned report line."""
+    return f"{name:<32} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms"
+
+def peak_memory(fn, *args):
+    """
+    Runs `fn(*args)` once under tracemalloc.
+
+    Returns:
+        tuple: `fn`'s result and the peak traced Python allocation during the call, in MiB.
+    """
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 2 ** 20
+
+def max_rss_mb():
+    """Returns the peak resident set size of this process so far, in MiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+def environment():
+    """Describes where a benchmark ran, so reports from different machines or commits are not compared blindly."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def write_report(results, output=None):
+    """
+    Writes benchmark results as JSON, together with the environment and the process's peak RSS.
+
+    Args:
+        results (dict): Results keyed by benchmark name.
+        output (str, optional): Destination file; printed to stdout when omitted.
+    """
+    report = {"environment": environment(), "max_rss_mb": max_rss_mb(), "results": results}
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text + "\n")
+        print(f"Report written to {output}")
+    else:
+        print(text)
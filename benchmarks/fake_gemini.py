@@ -0,0 +1,168 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = "I hear you and it makes sense to feel this way right now so let us take it one small step at a time together".split()
+
+class FakeGeminiConfig:
+    """Behaviour of the fake Gemini server."""
+
+    def __init__(self, first_token_delay=0.3, tokens_per_second=50.0, reply_tokens=120, tokens_per_chunk=8, error_rate=0.0, safety_rate=0.0, seed=None):
+        """
+        Initializes the fake server configuration.
+
+        Args:
+            first_token_delay (float, optional): Seconds before the first chunk (or the full non-streamed reply). Defaults to 0.3.
+            tokens_per_second (float, optional): Generation speed after the first token. Defaults to 50.
+            reply_tokens (int, optional): Number of words in every reply. Defaults to 120.
+            tokens_per_chunk (int, optional): Words per streamed chunk. Defaults to 8.
+            error_rate (float, optional): Share of requests answered with HTTP 429 RESOURCE_EXHAUSTED. Defaults to 0.
+            safety_rate (float, optional): Share of streamed replies cut off halfway with finishReason SAFETY. Defaults to 0.
+            seed (int, optional): Seed of the error injection.
+        """
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.tokens_per_chunk = tokens_per_chunk
+        self.error_rate = error_rate
+        self.safety_rate = safety_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+def _response(text, finished):
+    """Builds a GenerateContentResponse JSON object."""
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+def _blocked_response():
+    """Builds the final chunk of a stream stopped by the safety filters: no content, finishReason SAFETY."""
+    return {"candidates": [{
+        "finishReason": "SAFETY",
+        "index": 0,
+        "safetyRatings": [{"category": "HARM_CATEGORY_HARASSMENT", "probability": "HIGH"}],
+    }]}
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """
+    Serves `models/*:generateContent` and `models/*:streamGenerateContent` like the Gemini REST API.
+
+    Streamed replies are sent as an incrementally written JSON array, the format the
+    `google.generativeai` REST transport reads.
+    """
+
+    config = FakeGeminiConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        config = self.config
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        with config.lock:
+            config.requests += 1
+            rate_limited = config.random.random() < config.error_rate
+            blocked = config.random.random() < config.safety_rate
+
+        if rate_limited:
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (fake).", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        words = [WORDS[i % len(WORDS)] for i in range(config.reply_tokens)]
+        time.sleep(config.first_token_delay)
+
+        if ":streamGenerateContent" in self.path:
+            self._stream(words, blocked)
+        elif ":generateContent" in self.path:
+            time.sleep(len(words) / config.tokens_per_second)
+            self._send_json(200, _response(" ".join(words), True))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, words, blocked=False):
+        config = self.config
+        if blocked:
+            words = words[:len(words) // 2]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        step = config.tokens_per_chunk
+        for start in range(0, len(words), step):
+            if start:
+                time.sleep(step / config.tokens_per_second)
+            text = " ".join(words[start:start + step]) + " "
+            body = _response(text, start + step >= len(words) and not blocked)
+            self._write_chunk(("[" if not start else ",\n") + json.dumps(body))
+        if blocked:
+            self._write_chunk(("[" if not words else ",\n") + json.dumps(_blocked_response()))
+        self._write_chunk("]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        data = data.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """
+    Starts a fake Gemini server on a background thread.
+
+    Point the app at it with `GEMINI_TRANSPORT=rest` and `GEMINI_API_ENDPOINT=http://<host>:<port>`.
+
+    Args:
+        config (FakeGeminiConfig, optional): Server behaviour.
+        host (str, optional): Interface to bind. Defaults to 127.0.0.1.
+        port (int, optional): Port to bind, `0` picks a free one.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its endpoint is `http://{host}:{server.server_port}`.
+    """
+    handler = type("ConfiguredFakeGeminiHandler", (FakeGeminiHandler,), {"config": config or FakeGeminiConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini REST server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Seconds before the first chunk.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429.")
+    parser.add_argument("--safety-rate", type=float, default=0.0, help="Share of streamed replies cut off with finishReason SAFETY.")
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(
+        first_token_delay=args.first_token_delay,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        safety_rate=args.safety_rate,
+    )
+    server = start_server(config, args.host, args.port)
+    print(f"Fake Gemini listening on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Stopping server!")
+        server.shutdown()
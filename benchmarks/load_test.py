@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+
+import httpx
+
+from common import summarize, write_report
+from fake_gemini import FakeGeminiConfig, start_server
+
+MESSAGES = [
+    "I can't stop worrying about my exams next week",
+    "Today was honestly a great day, I finally finished my project",
+    "I feel so alone since my best friend moved away",
+    "Why does everyone ignore what I say, it makes me furious",
+    "I don't know, I guess I'm just tired",
+    "Thanks, that actually helps a lot",
+]
+
+class SessionStats:
+    """Per-request measurements of one load level."""
+
+    def __init__(self):
+        self.ttft = []  # Seconds until the first streamed chunk
+        self.latency = []  # Seconds until the exchange was saved (`done` event)
+        self.errors = 0
+
+async def send(client, chat_id, message, stats):
+    """Sends one message and reads its server-sent event stream to the end."""
+    start = time.perf_counter()
+    first = None
+    try:
+        async with client.stream("POST", f"/chats/{chat_id}/messages", json={"content": message}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line == "event: chunk" and first is None:
+                    first = time.perf_counter() - start
+                elif line == "event: error":
+                    stats.errors += 1
+                    return
+                elif line == "event: done":
+                    break
+    except httpx.HTTPError:
+        stats.errors += 1
+        return
+    stats.ttft.append(first if first is not None else time.perf_counter() - start)
+    stats.latency.append(time.perf_counter() - start)
+
+async def session(base_url, messages, think_time, rng, stats):
+    """
+    Simulates one user: a distinct session cookie creates a chat, chats with think time in between, then deletes it.
+
+    Think times are drawn from an exponential distribution with mean `think_time`.
+    """
+    cookies = {"session": f"load-{uuid.uuid4().hex}"}
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=120) as client:
+        try:
+            response = await client.post("/chats")
+            response.raise_for_status()
+        except httpx.HTTPError:
+            stats.errors += 1
+            return
+        chat_id = response.json()["id"]
+
+        for _ in range(messages):
+            if think_time:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+            await send(client, chat_id, rng.choice(MESSAGES), stats)
+
+        try:
+            await client.delete(f"/chats/{chat_id}")
+        except httpx.HTTPError:
+            stats.errors += 1
+
+async def run_level(base_url, sessions, messages, think_time, seed=0):
+    """
+    Runs `sessions` concurrent sessions of `messages` messages each.
+
+    Returns:
+        dict: Throughput, error count and TTFT/latency summaries of the level.
+    """
+    stats = SessionStats()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(session(base_url, messages, think_time, random.Random(rng.random()), stats) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "sessions": sessions,
+        "messages": len(stats.latency),
+        "errors": stats.errors,
+        "elapsed_s": elapsed,
+        "throughput_msg_s": len(stats.latency) / elapsed,
+    }
+    if stats.latency:
+        result["ttft"] = summarize(stats.ttft)
+        result["latency"] = summarize(stats.latency)
+    return result
+
+def start_api(host="127.0.0.1", port=8000):
+    """Serves `api.app` with uvicorn on a background thread and waits until it accepts requests."""
+    import uvicorn
+    from database.db import init_db
+
+    init_db()  # Before importing the API, which replays write-behind spools on import
+    from api import app
+
+    # The API's logging setup would otherwise log every request of the load generator's clients
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def run(levels=(1, 2, 4, 8, 16, 32), messages=5, think_time=1.0, url=None, first_token_delay=0.3, tokens_per_second=50.0, reply_tokens=120, error_rate=0.0, port=8000, safety_rate=0.0):
+    """
+    Drives increasing numbers of concurrent chat sessions through the API and records a latency curve.
+
+    Without `url`, a fake Gemini server and the API service (the real `LLM`, `core.emotions` and
+    `database.db` code paths) are started in this process. Must then run before the application
+    modules are imported elsewhere, since it points the Gemini client at the fake server.
+
+    Args:
+        levels (tuple[int], optional): Concurrent session counts, one load level each.
+        messages (int, optional): Messages sent per session.
+        think_time (float, optional): Mean pause before every message, in seconds.
+        url (str, optional): Base URL of an already running API service to load instead.
+        first_token_delay (float, optional): Fake Gemini delay before the first chunk, in seconds.
+        tokens_per_second (float, optional): Fake Gemini generation speed.
+        reply_tokens (int, optional): Words per fake Gemini reply.
+        error_rate (float, optional): Share of fake Gemini requests answered with HTTP 429.
+        port (int, optional): Port of the in-process API service.
+        safety_rate (float, optional): Share of fake Gemini replies cut off with finishReason SAFETY.
+            Sessions keep chatting after a blocked reply, so errors at 0 `error_rate` mean it broke the chat.
+
+    Returns:
+        dict: The load settings and one result per level.
+    """
+    results = {"settings": {"messages_per_session": messages, "think_time_s": think_time}}
+    gemini = api = None
+    if url is None:
+        config = FakeGeminiConfig(first_token_delay=first_token_delay, tokens_per_second=tokens_per_second, reply_tokens=reply_tokens, error_rate=error_rate, safety_rate=safety_rate)
+        gemini = start_server(config)
+        os.environ.update(GEMINI_TRANSPORT="rest", GEMINI_API_ENDPOINT=f"http://127.0.0.1:{gemini.server_port}")
+        os.environ.setdefault("GEMINI_API_KEY", "fake")
+        api = start_api(port=port)
+        url = f"http://127.0.0.1:{port}"
+        results["settings"].update(first_token_delay_s=first_token_delay, tokens_per_second=tokens_per_second, reply_tokens=reply_tokens, error_rate=error_rate, safety_rate=safety_rate)
+    results["settings"]["url"] = url
+
+    try:
+        results["levels"] = []
+        for sessions in levels:
+            level = asyncio.run(run_level(url, sessions, messages, think_time))
+            results["levels"].append(level)
+            print(format_level(level))
+    finally:
+        if api is not None:
+            api.should_exit = True
+        if gemini is not None:
+            gemini.shutdown()
+    return results
+
+def format_level(level):
+    """Formats one load level as a report line."""
+    line = f"{level['sessions']:>4} sessions  {level['throughput_msg_s']:7.2f} msg/s  errors {level['errors']:>3}"
+    if "latency" in level:
+        line += f"  ttft p50 {level['ttft']['p50_ms']:8.1f} p95 {level['ttft']['p95_ms']:8.1f} ms  latency p50 {level['latency']['p50_ms']:8.1f} p95 {level['latency']['p95_ms']:8.1f} p99 {level['latency']['p99_ms']:8.1f} ms"
+    return line
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate concurrent chat sessions end-to-end and report throughput/latency per load level.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrent session counts, one load level each.")
+    parser.add_argument("--messages", type=int, default=5, help="Messages sent per session.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause before every message, in seconds.")
+    parser.add_argument("--url", help="Load an already running API service (python run.py --api) instead of an in-process one.")
+    parser.add_argument("--database-url", help="Database of the in-process API service; a temporary SQLite file when omitted.")
+    parser.add_argument("--port", type=int, default=8000, help="Port of the in-process API service.")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Fake Gemini delay before the first chunk, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake Gemini requests answered with HTTP 429.")
+    parser.add_argument("--safety-rate", type=float, default=0.0, help="Share of fake Gemini replies cut off with finishReason SAFETY.")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 time-to-first-token objective used to report capacity.")
+    parser.add_argument("--output", help="JSON report file (printed when omitted).")
+    args = parser.parse_args()
+
+    if args.url is None:
+        # database.db reads DATABASE_URL on import
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/load.db"
+
+    results = run(
+        args.sessions, args.messages, args.think_time, args.url,
+        args.first_token_delay, args.tokens_per_second, args.reply_tokens, args.error_rate, args.port, args.safety_rate,
+    )
+
+    # Capacity: the highest level whose p95 time to first token stays within the objective without errors
+    within = [level["sessions"] for level in results["levels"] if level["errors"] == 0 and "ttft" in level and level["ttft"]["p95_ms"] <= args.slo_ms]
+    results["capacity_sessions"] = max(within, default=0)
+    print(f"Capacity: {results['capacity_sessions']} concurrent sessions within a {args.slo_ms:.0f} ms p95 time to first token")
+    write_report({"load": results}, args.output)
@@ -0,0 +1,38 @@
+import os
+import argparse
+import tempfile
+
+import pandas as pd
+
+from common import ROOT, write_report
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the emotion, database and reply benchmarks and write one JSON report.")
+    parser.add_argument("--output", default=str(ROOT / "benchmarks" / "results" / "latest.json"), help="JSON report file.")
+    parser.add_argument("--dataset", default=str(ROOT / "models" / "dataset" / "emotion_dataset_raw.csv"))
+    parser.add_argument("--samples", type=int, default=2000, help="Distinct messages scored by the emotion benchmark.")
+    parser.add_argument("--database-url", help="Empty database filled by the database benchmark; a temporary SQLite file when omitted.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="Message counts of the database benchmark.")
+    parser.add_argument("--db-samples", type=int, default=200, help="Calls timed per database helper and size.")
+    parser.add_argument("--replies", type=int, default=50, help="Replies streamed by the reply benchmark.")
+    parser.add_argument("--skip", nargs="+", default=[], choices=["emotions", "db", "reply"], help="Benchmarks not run.")
+    args = parser.parse_args()
+
+    # Every benchmark imports the application lazily, so the environment is set up first
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    import bench_db, bench_emotions, bench_reply
+
+    results = {}
+    if "emotions" not in args.skip:
+        print("Running emotion benchmark...")
+        messages = list(dict.fromkeys(pd.read_csv(args.dataset)['Text'].astype(str)))[:args.samples]
+        results["emotions"] = bench_emotions.run(messages)
+    if "reply" not in args.skip:
+        print("Running reply benchmark...")
+        results["reply"] = bench_reply.run(args.replies)
+    if "db" not in args.skip:
+        print("Running database benchmark...")
+        results["db"] = bench_db.run(sorted(args.sizes), args.db_samples)
+
+    write_report(results, args.output)
@@ -0,0 +1,178 @@
+import sys
+import json
+import pickle
+import argparse
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Make the application packages (core, database) importable from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "app"))
+
+from core.scorer import CompiledScorer
+
+DEFAULT_SOURCES = {
+    "joblib": "models/text_emotion.pkl",
+    "compiled": "models/text_emotion.pkl",
+    "onnx": "models/bert-emotion",
+}
+
+DEFAULT_DESTINATIONS = {
+    "joblib": "models/text_emotion.joblib",
+    "compiled": "models/text_emotion.npz",
+    "onnx": "models/bert-emotion-onnx",
+}
+
+def load_pickle(filename):
+    """Loads a pickled model pipeline."""
+    with open(filename, "rb") as file:
+        return pickle.load(file)
+
+def export_joblib(model, dst):
+    """
+    Serializes a model pipeline as an uncompressed joblib file.
+
+    Uncompressed joblib stores every NumPy array as a raw buffer, which lets
+    `core.emotions` open it with `mmap_mode="r"` and share the arrays between processes.
+    """
+    joblib.dump(model, dst)
+
+def export_compiled(model, dst, texts, atol=1e-6):
+    """
+    Compiles a TF-IDF + linear classifier pipeline into a standalone NumPy scorer.
+
+    The compiled scorer is checked against the pipeline on `texts` before it is written.
+
+    Args:
+        model: Fitted scikit-learn pipeline.
+        dst (str): Destination `.npz` file.
+        texts (list[str]): Texts used for the parity check.
+        atol (float, optional): Maximum absolute probability difference allowed. Defaults to 1e-6.
+
+    Returns:
+        float: Largest absolute probability difference observed.
+
+    Raises:
+        ValueError: If the scorer's probabilities drift from the pipeline's by more than `atol`.
+    """
+    scorer = CompiledScorer.from_pipeline(model)
+    error = np.abs(scorer.predict_proba(texts) - model.predict_proba(texts)).max()
+    if error > atol:
+        raise ValueError(f"Compiled scorer differs from the pipeline by {error:.2e} (tolerance {atol:.0e})")
+
+    scorer.save(dst)
+    return error
+
+def export_onnx(model_dir, dst, texts, quantize=False, atol=1e-4, opset=17):
+    """
+    Exports a fine-tuned transformer classifier (`train-v2.py`) to ONNX for `core.onnx_backend`.
+
+    Writes `model.onnx` with dynamic batch and sequence axes, the fast tokenizer as `tokenizer.json`
+    and the label order as `labels.json`; with `quantize`, also an int8 dynamically quantized
+    `model.int8.onnx`. The ONNX model is checked against PyTorch on `texts` before it is kept.
+
+    Args:
+        model_dir (str): Directory saved by `train-v2.py` (model and tokenizer).
+        dst (str): Destination directory.
+        texts (list[str]): Texts used for the parity check.
+        quantize (bool, optional): Also write the int8 model. Defaults to False.
+        atol (float, optional): Maximum absolute probability difference allowed for the fp32 model. Defaults to 1e-4.
+        opset (int, optional): ONNX opset version. Defaults to 17.
+
+    Returns:
+        dict: Largest absolute probability difference per written model file.
+
+    Raises:
+        ValueError: If the fp32 model's probabilities drift from PyTorch's by more than `atol`.
+    """
+    import torch
+    import onnxruntime
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, use_fast=True)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in names),
+        str(dst / "model.onnx"),
+        input_names=names,
+        output_names=["logits"],
+        dynamic_axes=axes,
+        opset_version=opset,
+    )
+    tokenizer.backend_tokenizer.save(str(dst / "tokenizer.json"))
+    (dst / "labels.json").write_text(json.dumps({
+        "labels": [model.config.id2label[i] for i in range(model.config.num_labels)],
+        "pad_token_id": tokenizer.pad_token_id or 0,
+    }))
+
+    files = ["model.onnx"]
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(dst / "model.onnx"), str(dst / "model.int8.onnx"), weight_type=QuantType.QInt8)
+        files.append("model.int8.onnx")
+
+    # Parity against PyTorch on padded batches
+    encoded = tokenizer(texts, padding=True, truncation=True, max_length=128, return_tensors="pt")
+    with torch.no_grad():
+        expected = torch.softmax(model(**{name: encoded[name] for name in names}).logits, dim=-1).numpy()
+
+    errors = {}
+    for name in files:
+        session = onnxruntime.InferenceSession(str(dst / name), providers=["CPUExecutionProvider"])
+        logits = session.run(None, {n: encoded[n].numpy() for n in names})[0]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        errors[name] = float(np.abs(exp / exp.sum(axis=1, keepdims=True) - expected).max())
+
+    if errors["model.onnx"] > atol:
+        raise ValueError(f"ONNX model differs from PyTorch by {errors['model.onnx']:.2e} (tolerance {atol:.0e})")
+    return errors
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the trained emotion model for serving.")
+    parser.add_argument("--src", help="Pickled model pipeline, or the train-v2.py model directory for onnx (defaults per format).")
+    parser.add_argument("--format", choices=DEFAULT_DESTINATIONS, default="joblib", help="Export format.")
+    parser.add_argument("--dst", help="Destination file or directory (defaults per format under models/).")
+    parser.add_argument("--dataset", default="models/dataset/emotion_dataset_raw.csv", help="Dataset used for the parity check.")
+    parser.add_argument("--quantize", action="store_true", help="onnx: also write an int8 dynamically quantized model.")
+    args = parser.parse_args()
+
+    src = args.src or DEFAULT_SOURCES[args.format]
+    dst = args.dst or DEFAULT_DESTINATIONS[args.format]
+
+    if args.format == "onnx":
+        texts = pd.read_csv(args.dataset)['Text'].astype(str).tolist()[:256]
+        try:
+            errors = export_onnx(src, dst, texts, quantize=args.quantize)
+        except ValueError as e:
+            print(f"Error exporting model: {e}")
+            sys.exit(1)
+        for name, error in errors.items():
+            print(f"{name}: max abs probability difference to PyTorch on {len(texts)} texts {error:.2e}")
+        print(f"Model exported successfully to '{dst}'")
+        sys.exit(0)
+
+    model = load_pickle(src)
+
+    if args.format == "compiled":
+        texts = pd.read_csv(args.dataset)['Text'].astype(str).tolist()
+        try:
+            error = export_compiled(model, dst, texts)
+        except ValueError as e:
+            print(f"Error exporting model: {e}")
+            sys.exit(1)
+        print(f"Parity check passed on {len(texts)} texts (max abs difference {error:.2e})")
+    else:
+        export_joblib(model, dst)
+
+    print(f"Model exported successfully as '{dst}'")
@@ -1,30 +1,74 @@
+import os
 import sys
+import argparse
 import subprocess
 from pathlib import Path
 from dotenv import load_dotenv
 
+def migrate():
+    """
+    Creates the database schema once before the application processes start.
+    """
+    sys.path.insert(0, "src/app")
+    from database.db import init_db  # Imported after load_dotenv() so DATABASE_URL is set
+
+    init_db()
+
+def run_api(host, port, workers):
+    """
+    Runs the headless FastAPI service (`src/app/api.py`) with uvicorn.
+
+    Each worker process holds its own emotion model, LLM sessions and database pool, so the
+    service scales out by adding workers or instances behind a load balancer.
+    """
+    subprocess.run(
+        ["uvicorn", "api:app", "--app-dir", "src/app", "--host", host, "--port", str(port), "--workers", str(workers)],
+        check=True,
+        env={**os.environ, "API_WORKERS": str(workers)},  # api.py turns the per-process read cache off for several workers
+    )
+
 def main():
     """
-    Main function to load environment variables and start the Streamlit application.
+    Main function to load environment variables and start the Streamlit application or the API service.
     
     - Loads environment variables from a .env file using `load_dotenv()`.
+    - With `--init-db`, only creates or migrates the database schema.
     - Checks if the Streamlit application file exists.
-    - Runs the Streamlit application using `subprocess.run()`.
+    - Creates the database schema using `migrate()`.
+    - Runs the Streamlit application using `subprocess.run()`, or the API service with `--api`.
     - Handles errors gracefully, including missing files and process execution failures.
     """
     load_dotenv()  # Load environment variables from .env file
 
-    app_path = Path("src/app/main.py")  # Define the path to the Streamlit application
+    parser = argparse.ArgumentParser(description="Run Anveshak Neo.")
+    parser.add_argument("--api", action="store_true", help="Run the headless API service instead of the Streamlit app.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"), help="API bind address.")
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", 8000)), help="API port.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", 1)), help="API worker processes.")
+    parser.add_argument("--init-db", action="store_true", help="Only create or migrate the database schema, then exit.")
+    args = parser.parse_args()
+
+    if args.init_db:
+        migrate()
+        print("Database schema is up to date.")
+        return
+
+    app_path = Path("src/app/api.py" if args.api else "src/app/main.py")  # Define the path to the application
     
     if not app_path.exists():
         print(f"Error: Could not find {app_path}")  # Print an error message if the file is missing
         sys.exit(1)  # Exit with an error status code
+
+    migrate()  # Run schema creation once instead of on every import of the database module
     
     try:
-        # Run the Streamlit application with usage statistics disabled
-        subprocess.run(["streamlit", "run", str(app_path), "--browser.gatherUsageStats", "false"], check=True)
+        if args.api:
+            run_api(args.host, args.port, args.workers)
+        else:
+            # Run the Streamlit application with usage statistics disabled
+            subprocess.run(["streamlit", "run", str(app_path), "--browser.gatherUsageStats", "false"], check=True)
     except subprocess.CalledProcessError as e:
-        print(f"Error running Streamlit app: {e}")  # Handle errors during Streamlit execution
+        print(f"Error running app: {e}")  # Handle errors during app execution
         sys.exit(1)  # Exit with an error status code
     except KeyboardInterrupt:
         print("Stopping app!")  # Handle user interruption (Ctrl+C)
@@ -0,0 +1,210 @@
+import os
+import json
+import uuid
+import asyncio
+import weakref
+import logging
+import functools
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()  # Load environment variables before the LLM and database modules read them
+
+# The database read cache (database.db) is per process and only kept current by that process's own
+# writes, so several workers serving the same chats must read the database directly
+if int(os.getenv("API_WORKERS") or os.getenv("WEB_CONCURRENCY") or 1) > 1:
+    os.environ["DB_CACHE_SIZE"] = "0"
+
+from fastapi import Cookie, Depends, FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from core import metrics
+from core.async_llm import AsyncLLM
+from core.llm_response import get_llm, llm_cache
+from core.trajectory import EmotionTrajectory
+from database.db import create_new_chat, delete_chat, get_chat, get_chat_messages_page, get_chat_summary, get_chat_title, get_recent_chats, iter_chat_messages, recover_writes, save_chat_summary, save_chat_title, save_exchange
+
+# Page sizes of chat and message listings, and the history a reply is based on
+CHAT_LIST_LIMIT = int(os.getenv("CHAT_LIST_LIMIT", 50))
+MESSAGE_HISTORY_LIMIT = int(os.getenv("MESSAGE_HISTORY_LIMIT", 200))
+
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE = 365 * 24 * 60 * 60
+
+# uvicorn only configures its own loggers; the application's (and the metrics log exporter's) go to the root logger
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Anveshak Neo API")
+# The Prometheus exporter is served on /metrics below rather than on a port of its own
+metrics.start_exporters(serve_http=False)
+# Store messages that a crashed process had queued with write-behind
+recover_writes()
+
+# Replies are serialized per chat: an LLM holds one conversation at a time. A chat's lock is
+# dropped once no reply holds or awaits it, so the mapping only grows with concurrent chats
+_chat_locks = weakref.WeakValueDictionary()
+# Strong references to background title tasks, so they are not garbage collected mid-flight
+_background = set()
+
+class ChatOut(BaseModel):
+    id: int
+    title: str | None
+    created_at: datetime | None
+    last_message_at: datetime | None
+    mood: str | None
+
+class MessageOut(BaseModel):
+    id: int | None
+    role: str
+    content: str
+    timestamp: datetime | None
+
+class MessageIn(BaseModel):
+    content: str
+
+def get_session_id(response: Response, session: str | None = Cookie(default=None)):
+    """Returns the persistent session id from the session cookie, issuing a new one if missing."""
+    if session:
+        return session
+    session = uuid.uuid4().hex
+    response.set_cookie(SESSION_COOKIE, session, max_age=SESSION_MAX_AGE, httponly=True, samesite="lax")
+    return session
+
+def owned_chat(chat_id: int, session_id: str = Depends(get_session_id)):
+    """Returns the chat if it belongs to the caller's session; responds 404 otherwise."""
+    chat = get_chat(chat_id)
+    if chat is None or chat.session_id != session_id:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return chat
+
+def chat_out(chat):
+    mood = EmotionTrajectory.from_dict(chat.emotion_trajectory).mood()
+    return ChatOut(id=chat.id, title=chat.title, created_at=chat.created_at, last_message_at=chat.last_message_at, mood=mood)
+
+def message_out(message):
+    return MessageOut(id=message.id, role=message.role, content=message.content, timestamp=message.timestamp)
+
+def sse(event, data):
+    """Formats a server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Serves the process's metrics in the Prometheus text format when the prometheus exporter is enabled."""
+    if "prometheus" not in metrics.EXPORTERS:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/chats", status_code=201)
+def create_chat(session_id: str = Depends(get_session_id)) -> ChatOut:
+    """Starts a new chat for the caller's session."""
+    return chat_out(get_chat(create_new_chat(session_id)))
+
+@app.get("/chats")
+def list_chats(limit: int = CHAT_LIST_LIMIT, before_at: datetime | None = None, before_id: int | None = None, session_id: str = Depends(get_session_id)) -> list[ChatOut]:
+    """
+    Lists the caller's chats, most recent activity first.
+
+    Pass the `last_message_at` and `id` of the last chat received as `before_at` and `before_id` for the next page.
+    """
+    before = (before_at, before_id) if before_at and before_id else None
+    return [chat_out(chat) for chat in get_recent_chats(session_id, limit=min(limit, CHAT_LIST_LIMIT), before=before)]
+
+@app.delete("/chats/{chat_id}", status_code=204)
+def remove_chat(chat=Depends(owned_chat)):
+    """Deletes one of the caller's chats."""
+    delete_chat(chat.id)
+    llm_cache.pop(chat.id)
+
+@app.get("/chats/{chat_id}/messages")
+def list_messages(limit: int = MESSAGE_HISTORY_LIMIT, before_at: datetime | None = None, before_id: int | None = None, chat=Depends(owned_chat)) -> list[MessageOut]:
+    """
+    Lists a chat's messages, oldest first, ending with the latest one.
+
+    Pass the `timestamp` and `id` of the oldest message received as `before_at` and `before_id` for the previous page.
+    """
+    before = (before_at, before_id) if before_at and before_id else None
+    return [message_out(message) for message in get_chat_messages_page(chat.id, limit=min(limit, MESSAGE_HISTORY_LIMIT), before=before)]
+
+@app.post("/chats/{chat_id}/messages")
+async def send_message(body: MessageIn, chat=Depends(owned_chat)):
+    """
+    Sends a message and streams the reply as server-sent events.
+
+    Events: `chunk` (`{"text": ...}`) while the reply streams, `title` (`{"title": ...}`) when the
+    chat got its first title, then `done` (`{"content": ...}`) once the exchange is saved, or `error`.
+    """
+    content = body.content.strip()
+    if not content:
+        raise HTTPException(status_code=422, detail="Message is empty")
+
+    async def events():
+        lock = _chat_locks.setdefault(chat.id, asyncio.Lock())
+        async with lock:
+            summary, summary_message_id = await run_in_threadpool(get_chat_summary, chat.id)
+            history = await run_in_threadpool(get_chat_messages_page, chat.id, MESSAGE_HISTORY_LIMIT)
+            llm = await run_in_threadpool(
+                get_llm,
+                chat.id,
+                history,
+                summary=summary,
+                summary_message_id=summary_message_id,
+                on_summary=functools.partial(save_chat_summary, chat.id),
+                trajectory=chat.emotion_trajectory,
+                # A full page may have left older turns out; they are folded into the summary
+                older=functools.partial(
+                    iter_chat_messages, chat.id, before=(history[0].timestamp, history[0].id)
+                ) if len(history) >= MESSAGE_HISTORY_LIMIT else None,
+            )
+            client = AsyncLLM(llm)
+
+            title_task = None
+            if not await run_in_threadpool(get_chat_title, chat.id):
+                # Generate the title alongside the reply; it is saved once ready
+                async def generate_title():
+                    title = await client.get_title(content)
+                    await run_in_threadpool(save_chat_title, chat.id, title)
+                    return title
+
+                title_task = asyncio.create_task(generate_title())
+                _background.add(title_task)
+                title_task.add_done_callback(_background.discard)
+
+            def save_user_turn():
+                # Keeps the user's message when no reply is saved with it
+                save_exchange(chat.id, content, None, user_prompt=llm.last_prompt, trajectory=llm.trajectory.to_dict())
+
+            parts = []
+            try:
+                async for chunk in client.reply(content):
+                    parts.append(chunk)
+                    yield sse("chunk", {"text": chunk})
+            except Exception:
+                logger.exception("Reply to chat %s failed", chat.id)
+                await run_in_threadpool(save_user_turn)
+                yield sse("error", {"detail": "The model could not reply, please try again."})
+                return
+            except BaseException:
+                # The client disconnected mid-stream; shielded, so the save outlives the cancellation
+                await asyncio.shield(run_in_threadpool(save_user_turn))
+                raise
+
+            reply = "".join(parts).strip()
+            await run_in_threadpool(save_exchange, chat.id, content, reply, user_prompt=llm.last_prompt, trajectory=llm.trajectory.to_dict())
+
+            if title_task is not None and title_task.done() and not title_task.cancelled() and title_task.exception() is None:
+                yield sse("title", {"title": title_task.result()})
+            yield sse("done", {"content": reply})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
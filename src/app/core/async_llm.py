@@ -0,0 +1,173 @@
+import os
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core import exceptions as api_exceptions
+
+from core.emotions import normalize_text
+from core.llm_response import score_emotions
+
+# Upstream errors worth retrying after a pause
+RATE_LIMIT_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+)
+
+class RateLimiter:
+    """
+    Caps upstream Gemini calls: at most `max_concurrency` in flight, started at no more
+    than `rate` per second (token bucket with `burst` capacity).
+
+    Use as `async with limiter:` around each call. Bound to the event loop that first uses it.
+    """
+
+    def __init__(self, max_concurrency=16, rate=None, burst=None):
+        """
+        Initializes the limiter.
+
+        Args:
+            max_concurrency (int, optional): Maximum number of concurrent calls. Defaults to 16.
+            rate (float, optional): Calls started per second; `None` disables the token bucket.
+            burst (int, optional): Token bucket capacity. Defaults to `max_concurrency`.
+        """
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst or max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket_lock = asyncio.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def _take_token(self):
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self.rate:
+            try:
+                await self._take_token()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Returns a full-jitter exponential backoff delay in seconds for the given retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+RETRIES = int(os.getenv("LLM_RETRIES", 3))
+
+# Process-wide limiter shared by every AsyncLLM
+limiter = RateLimiter(
+    max_concurrency=MAX_CONCURRENCY,
+    rate=float(os.getenv("LLM_RATE_LIMIT", 0)) or None,
+)
+
+# google.generativeai only offers asyncio clients over gRPC, so blocking calls run on a
+# pool sized to the concurrency cap: blocked threads never outnumber in-flight requests.
+upstream = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="gemini")
+
+# In-flight title requests, so identical concurrent requests share one upstream call
+_title_requests = {}
+
+class AsyncLLM:
+    """Asyncio interface to an `LLM` with concurrency limits, retries and title coalescing."""
+
+    def __init__(self, llm, limiter=limiter, retries=RETRIES):
+        """
+        Initializes the async client.
+
+        Args:
+            llm (LLM): The chat's LLM.
+            limiter (RateLimiter, optional): Limiter for upstream calls. Defaults to the process-wide one.
+            retries (int, optional): Retries after a rate-limit error. Defaults to `LLM_RETRIES`.
+        """
+        self.llm = llm
+        self.limiter = limiter
+        self.retries = retries
+
+    async def _call(self, fn, *args):
+        """Runs a blocking upstream call under the limiter, retrying rate-limit errors with jittered backoff."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            async with self.limiter:
+                try:
+                    return await loop.run_in_executor(upstream, fn, *args)
+                except RATE_LIMIT_ERRORS:
+                    if attempt == self.retries:
+                        raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def get_title(self, message):
+        """
+        Generates a chat title.
+
+        Requests for the same (normalized) first message share one upstream call while it is
+        in flight; later turns are only coalesced within the same chat.
+
+        Args:
+            message (str): User's message.
+
+        Returns:
+            str: Generated chat title.
+        """
+        history = self.llm.context_history()
+        key = (normalize_text(message), id(self.llm) if history else None)
+
+        future = _title_requests.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call(self.llm.get_title, message, history))
+            _title_requests[key] = future
+            future.add_done_callback(lambda _: _title_requests.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def reply(self, message, emotions=None):
+        """
+        Streams the reply to a message.
+
+        The limiter slot is held for the whole stream. Rate-limit errors raised before the
+        first chunk are retried; `LLM.reply` drops the user turn when a request fails before
+        anything was received, whether sending or reading the stream, and rebuilds the chat
+        session, so retries do not duplicate it.
+
+        Args:
+            message (str): User's message.
+            emotions (dict, optional): Emotion probabilities of `message`. Scored in the background when omitted.
+
+        Yields:
+            str: Partial responses streamed from the model.
+        """
+        self.llm.last_prompt = None  # Set by `LLM.reply` once the message is scored
+        if emotions is None:
+            emotions = await asyncio.wrap_future(score_emotions(message))
+
+        loop = asyncio.get_running_loop()
+        done = object()
+        for attempt in range(self.retries + 1):
+            async with self.limiter:
+                stream = self.llm.reply(message, emotions=emotions)
+                try:
+                    chunk = await loop.run_in_executor(upstream, next, stream, done)
+                except RATE_LIMIT_ERRORS:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    while chunk is not done:
+                        yield chunk
+                        chunk = await loop.run_in_executor(upstream, next, stream, done)
+                    return
+            await asyncio.sleep(backoff_delay(attempt))
@@ -1,12 +1,190 @@
-from collections import defaultdict
+import os
+import re
 import pickle
+import threading
+import numpy as np
+from pathlib import Path
 
-# Load pre-trained text emotion classification model using pickle
-model = pickle.load(open("models/text_emotion.pkl", "rb"))
+from core import metrics
+from core.cache import LRUCache
+from core.preprocessing import clean_text
 
-# Extract emotion labels from the final step of the model pipeline
-EMOTIONS = model.named_steps[list(model.named_steps.keys())[-1]].classes_
+# Model artifacts live in the repository's models/ directory, independent of the working directory
+MODELS_DIR = Path(__file__).resolve().parents[3] / "models"
 
+# "sklearn" serves the TF-IDF pipeline (or its exports), "onnx" the exported transformer (see core.onnx_backend)
+BACKEND = os.getenv("EMOTION_BACKEND", "sklearn").lower()
+
+def default_model_path():
+    """
+    Resolves the emotion model to load.
+
+    `EMOTION_MODEL_PATH` wins when set. The onnx backend loads `EMOTION_ONNX_PATH`; otherwise the
+    compiled NumPy scorer is preferred, then the memory-mappable joblib export, then the plain pickle.
+    Exports older than the pickle are skipped, since they were made from an earlier model.
+
+    Returns:
+        Path: Path of the serialized model.
+    """
+    if os.getenv("EMOTION_MODEL_PATH"):
+        return Path(os.environ["EMOTION_MODEL_PATH"])
+
+    if BACKEND == "onnx":
+        return Path(os.getenv("EMOTION_ONNX_PATH", MODELS_DIR / "bert-emotion-onnx"))
+
+    pickle_path = MODELS_DIR / "text_emotion.pkl"
+    trained_at = pickle_path.stat().st_mtime if pickle_path.exists() else 0
+    for name in ("text_emotion.npz", "text_emotion.joblib"):
+        path = MODELS_DIR / name
+        if path.exists() and path.stat().st_mtime >= trained_at:
+            return path
+    return pickle_path
+
+def load_model(path):
+    """
+    Loads a serialized emotion model from disk.
+
+    Compiled `.npz` scorers are loaded without importing scikit-learn. Joblib exports are
+    opened with `mmap_mode="r"`, so the large NumPy arrays (IDF vector, coefficient
+    matrices) are memory-mapped and shared through the page cache by every worker process
+    on the host instead of being copied into each one.
+
+    Args:
+        path (str | Path): Path of an exported ONNX model directory, a compiled `.npz` scorer, a `.joblib` export or a pickle file.
+
+    Returns:
+        A model exposing `predict_proba` and `classes_`.
+    """
+    path = Path(path)
+    if path.is_dir() or path.suffix == ".onnx":
+        from core.onnx_backend import OnnxEmotionModel
+        return OnnxEmotionModel(path)
+    if path.suffix == ".npz":
+        from core.scorer import CompiledScorer
+        return CompiledScorer.load(path)
+
+    if path.suffix == ".joblib":
+        import joblib
+        return joblib.load(path, mmap_mode="r")
+
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+_model = None
+_emotions = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the process-wide emotion model, loading it on first use.
+
+    The instance is shared by every Streamlit rerun and session served by this process.
+    """
+    global _model, _emotions
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                model = load_model(default_model_path())
+                # Emotion labels as ordered by the final step of the model pipeline
+                _emotions = model.classes_
+                _model = model
+    return _model
+
+def get_emotions():
+    """Returns the emotion labels predicted by the model, in column order."""
+    get_model()
+    return _emotions
+
+def __getattr__(name):
+    # Keep `model` and `EMOTIONS` importable without loading the model at import time
+    if name == "model":
+        return get_model()
+    if name == "EMOTIONS":
+        return get_emotions()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Memoized predictions keyed by normalized text, so repeated short messages skip the pipeline
+prediction_cache = LRUCache(
+    maxsize=int(os.getenv("EMOTION_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("EMOTION_CACHE_TTL", 0)) or None,
+)
+metrics.add_collector("prediction_cache", lambda: {"hits": prediction_cache.hits, "misses": prediction_cache.misses})
+
+# Apply the training-time text cleaning (core.preprocessing) before scoring. Off by default for
+# the transformer, which is fine-tuned on raw text.
+PREPROCESS = os.getenv("EMOTION_PREPROCESS", "false" if BACKEND == "onnx" else "true").lower() in ("1", "true", "yes")
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(msg):
+    """
+    Normalizes a message before cache lookup.
+
+    The default TF-IDF vectorizer lowercases its input and splits tokens on whitespace, so lowercasing
+    and collapsing whitespace maps equivalent messages to one key without changing predictions.
+
+    Args:
+        msg (str): The input message.
+
+    Returns:
+        str: The normalized message.
+    """
+    return WHITESPACE_RE.sub(" ", msg).strip().lower()
+
+def prepare_texts(texts):
+    """
+    Turns messages into model input, applying the same cleaning as training when `EMOTION_PREPROCESS` is on.
+
+    Args:
+        texts (Iterable[str]): The input messages.
+
+    Returns:
+        list[str]: Texts ready for `predict_proba`.
+    """
+    return [clean_text(text) for text in texts] if PREPROCESS else list(texts)
+
+@metrics.timed("get_prediction_proba_batch")
+def get_prediction_proba_batch(messages):
+    """
+    Predict the probability distributions over emotion classes for many messages at once.
+
+    Cached messages are answered from `prediction_cache`; the remaining ones go through the
+    model pipeline in a single call, so the TF-IDF vectorizer and classifier are dispatched
+    once instead of once per message.
+
+    Args:
+        messages (list[str]): The input messages (texts) to classify.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A `(len(messages), len(EMOTIONS))` matrix of prediction
+        probabilities (in percentage) and the `EMOTIONS` label vector naming its columns.
+    """
+    model = get_model()
+    emotions = get_emotions()
+    keys = [normalize_text(msg) for msg in messages]
+    probabilities = np.empty((len(keys), len(emotions)))
+
+    # Serve cached rows and collect the distinct texts that still need scoring
+    missing = {}
+    for idx, key in enumerate(keys):
+        cached = prediction_cache.get(key)
+        if cached is None:
+            missing.setdefault(key, []).append(idx)
+        else:
+            probabilities[idx] = cached
+
+    if missing:
+        # Get prediction probabilities for the uncached messages and convert them to percentages
+        texts = list(missing)
+        for key, row in zip(texts, model.predict_proba(prepare_texts(texts)) * 100):
+            row = row.copy()
+            row.flags.writeable = False
+            prediction_cache.set(key, row)
+            probabilities[missing[key]] = row
+
+    return probabilities, emotions
+
+@metrics.timed("get_prediction_proba")
 def get_prediction_proba(msg):
     """
     Predict the probability distribution over emotion classes for a given message.
@@ -17,15 +195,5 @@ def get_prediction_proba(msg):
     Returns:
         dict: A dictionary with emotion labels as keys and corresponding prediction probabilities (in percentage) as values.
     """
-    final_prob = defaultdict(float)
-    
-    # Get prediction probabilities from the model for the input message
-    for prob in model.predict_proba([msg]):
-        for idx, p in enumerate(prob):
-            final_prob[EMOTIONS[idx]] += p
-
-    # Convert probabilities to percentages
-    for k, v in final_prob.items():
-        final_prob[k] = v * 100
-
-    return final_prob
+    probabilities, emotions = get_prediction_proba_batch([msg])
+    return dict(zip(emotions, probabilities[0].tolist()))
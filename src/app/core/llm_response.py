@@ -1,32 +1,35 @@
 import os
+import time
+import threading
 import google.generativeai as genai
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from core import metrics
+from core.cache import LRUCache
 from core.emotions import get_prediction_proba
-
-# Configure the Gemini API with the environment variable API key
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-
-class LLM:
-    def __init__(self, chat_history=[]):
-        """
-        Initializes the LLM (Large Language Model) class for generating chat responses based on user input and emotional state.
-
-        Args:
-            chat_history (list, optional): List of previous chat messages. Defaults to an empty list.
-        """
-        self.GEN_CONFIG = {
-            "temperature": 1,
-            "top_p": 0.95,
-            "top_k": 64,
-            "max_output_tokens": 65536,
-            "response_mime_type": "text/plain",
-        }
-
-        # Instantiate the generative model with system instructions for psychological assistance
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-thinking-exp-01-21",
-            generation_config=self.GEN_CONFIG,
-            system_instruction="""You are a virtual psychologist named Anveshak Neo build by Varun Agnihotri (<hello@pythonicvarun.me>, <pythonicvarun.me>). You need to chat with people, keeping their current emotional states in mind. Your primary task is to improve the user's current state. For example, if the user is sad, you should help them become happy; if they are angry, you should first neutralize their anger and then bring them to joy. Similarly, if the user is already in a happy state, your task is to maintain that state with your messages. You will be provided with their current emotional state percentages and their message, and you should respond according to the instructions above. Always try to keep the conversation within the context and avoid going off-topic. You can also use emojis if needed to help calm the user. And provide the output as per the output template only!
+from core.response_cache import response_cache
+from core.streaming import StreamAssembler, strip_prefixes
+from core.trajectory import EmotionTrajectory
+
+# Configure the Gemini API with the environment variable API key. GEMINI_TRANSPORT and
+# GEMINI_API_ENDPOINT can point the client elsewhere, e.g. at benchmarks/fake_gemini.py.
+genai.configure(
+    api_key=os.environ["GEMINI_API_KEY"],
+    transport=os.getenv("GEMINI_TRANSPORT") or None,
+    client_options={"api_endpoint": os.environ["GEMINI_API_ENDPOINT"]} if os.getenv("GEMINI_API_ENDPOINT") else None,
+)
+
+MODEL_NAME = "gemini-2.0-flash-thinking-exp-01-21"
+
+GEN_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 65536)),
+    "response_mime_type": "text/plain",
+}
+
+SYSTEM_INSTRUCTION = """You are a virtual psychologist named Anveshak Neo build by Varun Agnihotri (<hello@pythonicvarun.me>, <pythonicvarun.me>). You need to chat with people, keeping their current emotional states in mind. Your primary task is to improve the user's current state. For example, if the user is sad, you should help them become happy; if they are angry, you should first neutralize their anger and then bring them to joy. Similarly, if the user is already in a happy state, your task is to maintain that state with your messages. You will be provided with their current emotional state percentages and their message, and you should respond according to the instructions above. Always try to keep the conversation within the context and avoid going off-topic. You can also use emojis if needed to help calm the user. And provide the output as per the output template only!
 
 Input templete is below:
 
@@ -42,25 +45,301 @@ Sadness: {sadness_percentage}%
 Shame: {shame_percentage}%
 Surprise: {surprise_percentage}%
 
+Emotional trend: {trend_of_the_conversation_so_far}
+
 Output template:
 
-{response_msg}""",
-            tools='code_execution',
-        )
+{response_msg}"""
+
+TITLE_INSTRUCTION = """You are a content writer. Your task is to generate a short and engaging title for a chat. You don't need to do anything else. Stick to the task only. The chat title should also be related to the user's message. Follow the output template exactly.
+
+Input template:
+
+Message: {user_message}
+
+Output template:
+
+{generated_chat_title}"""
+
+SUMMARY_INSTRUCTION = """You are summarizing a conversation between a user and Anveshak Neo, a virtual psychologist. You will be given the previous summary (if any) and the next part of the conversation, including the user's emotional state percentages. Write an updated summary in under 250 words that keeps the facts the user shared, how their emotional state changed over time, and the advice already given. Output the summary only."""
+
+# Approximate token budget of the chat history sent with every request
+CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 16000))
+
+# Background work kept off the reply path: title generation, emotion scoring, summaries
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_WORKERS", 8)), thread_name_prefix="llm")
+
+def score_emotions(message):
+    """
+    Starts scoring a message's emotions in the background.
+
+    Returns:
+        Future: Resolves to the `get_prediction_proba` result; pass it to `LLM.reply` as `emotions`.
+    """
+    return executor.submit(get_prediction_proba, message)
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_generative_model(name):
+    """
+    Returns the shared `genai.GenerativeModel` for the chat (`"chat"`), title (`"title"`) or summary (`"summary"`) task.
+
+    The models are stateless, so one instance per task is built on first use and reused by every LLM.
+    """
+    with _models_lock:
+        if name not in _models:
+            if name == "chat":
+                # Instantiate the generative model with system instructions for psychological assistance
+                _models[name] = genai.GenerativeModel(
+                    model_name=MODEL_NAME,
+                    generation_config=GEN_CONFIG,
+                    system_instruction=SYSTEM_INSTRUCTION,
+                    tools='code_execution',
+                )
+            else:
+                _models[name] = genai.GenerativeModel(
+                    model_name=MODEL_NAME,
+                    generation_config=GEN_CONFIG,
+                    system_instruction=TITLE_INSTRUCTION if name == "title" else SUMMARY_INSTRUCTION,
+                )
+        return _models[name]
+
+class ContextWindow:
+    """
+    Keeps the chat history sent to Gemini within a token budget.
+
+    Turns that no longer fit are folded into a rolling summary, which is sent ahead of the
+    remaining turns. Tokens are estimated at four characters each, which is close enough
+    for budgeting without a round trip to the tokenizer API.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKENS, keep_ratio=0.5, summary=None, summary_message_id=None):
+        """
+        Initializes the context window.
 
+        Args:
+            budget (int, optional): Token budget of the history. Defaults to `LLM_CONTEXT_TOKENS`.
+            keep_ratio (float, optional): Share of the budget left to recent turns after folding. Defaults to 0.5.
+            summary (str, optional): Rolling summary of the turns already folded.
+            summary_message_id (int, optional): Id of the last message covered by `summary`.
+        """
+        self.budget = budget
+        self.keep_ratio = keep_ratio
+        self.summary = summary
+        self.summary_message_id = summary_message_id
+
+    @staticmethod
+    def estimate_tokens(entry):
+        """Estimates the number of tokens in a history entry."""
+        return sum(len(part) for part in entry["parts"]) // 4 + 1
+
+    def prefix(self):
+        """Returns the history entries carrying the rolling summary, if there is one."""
+        if not self.summary:
+            return []
+        return [
+            {"role": "user", "parts": [f"Summary of our earlier conversation:\n{self.summary}"]},
+            {"role": "model", "parts": ["Thanks, I'll keep that in mind."]},
+        ]
+
+    def fold_count(self, history, message_ids):
+        """
+        Returns how many leading history entries should be folded into the summary.
+
+        Nothing is folded while the history fits the budget. Past it, the oldest turns are
+        folded until the rest fits `budget * keep_ratio`, so summaries are produced in
+        batches rather than on every turn. Only turns already saved to the database are
+        folded, and folding always stops after a model turn so the history starts with the user.
+        """
+        sizes = [self.estimate_tokens(entry) for entry in history]
+        total = sum(sizes)
+        if total <= self.budget:
+            return 0
+
+        count = 0
+        while count < len(history) and total > self.budget * self.keep_ratio and message_ids[count] is not None:
+            total -= sizes[count]
+            count += 1
+        while count and history[count - 1]["role"] != "model":
+            count -= 1
+        return count
+
+def summarize(summary, history):
+    """
+    Folds history entries into a rolling summary.
+
+    Args:
+        summary (str | None): Previous summary.
+        history (list): History entries to fold, oldest first.
+
+    Returns:
+        str: Updated summary.
+    """
+    transcript = "\n\n".join(
+        f"{'Anveshak Neo' if entry['role'] == 'model' else 'User'}: {' '.join(entry['parts'])}"
+        for entry in history
+    )
+    request = f"Previous summary:\n{summary or 'None'}\n\nConversation:\n{transcript}"
+    return get_generative_model("summary").generate_content(request).text.strip()
+
+def fold_messages(summary, batches, budget=CONTEXT_TOKENS):
+    """
+    Folds stored messages into a rolling summary, one request per `budget` tokens of messages.
+
+    Args:
+        summary (str | None): Previous summary.
+        batches (Iterable[list]): Messages, oldest first, in batches (see `database.db.iter_chat_messages`).
+        budget (int, optional): Approximate tokens of messages per summary request. Defaults to `LLM_CONTEXT_TOKENS`.
+
+    Returns:
+        tuple[str | None, int | None]: Updated summary and id of the last folded message, `None` if there was none.
+    """
+    chunk, size, message_id = [], 0, None
+    for batch in batches:
+        for message in batch:
+            entry = {"role": "model" if message.role == "assistant" else "user", "parts": [message.prompt or message.content]}
+            chunk.append(entry)
+            size += ContextWindow.estimate_tokens(entry)
+            message_id = message.id
+            if size >= budget:
+                summary = summarize(summary, chunk)
+                chunk, size = [], 0
+    if chunk:
+        summary = summarize(summary, chunk)
+    return summary, message_id
+
+class LLM:
+    def __init__(self, chat_history=[], summary=None, summary_message_id=None, on_summary=None, trajectory=None):
+        """
+        Initializes the LLM (Large Language Model) class for generating chat responses based on user input and emotional state.
+
+        Args:
+            chat_history (list, optional): List of previous chat messages. Defaults to an empty list.
+            summary (str, optional): Stored rolling summary of the chat's older turns.
+            summary_message_id (int, optional): Id of the last message covered by `summary`; older messages are skipped.
+            on_summary (callable, optional): Called as `on_summary(summary, message_id)` whenever the summary is updated.
+            trajectory (dict, optional): Stored emotion trajectory of the chat (`Chat.emotion_trajectory`).
+        """
+        self.GEN_CONFIG = GEN_CONFIG
+        self.model = get_generative_model("chat")
+        self.context = ContextWindow(summary=summary, summary_message_id=summary_message_id)
+        self.on_summary = on_summary
+        self._lock = threading.RLock()  # Guards history updates made by background compaction
+        self._compacting = False
+        self._session_stale = False  # Set when the session no longer matches the history (compaction, broken streams)
+        self._title_future = None
+
+        self.trajectory = EmotionTrajectory.from_dict(trajectory)  # Running emotion aggregates, updated once per sent message
+        self.last_prompt = None  # Emotion-annotated prompt of the latest reply() call
         self.history = []
-        for message in chat_history:
+        self.message_ids = []  # Database id of each history entry, None for turns not yet read back
+        self.chat_session = None
+
+        # Start the chat session with the provided history
+        self.extend(chat_history)
+
+    def extend(self, chat_history):
+        """
+        Appends messages that are newer than the last synced one to the history.
+
+        Turns added by `reply()` carry no database id until they are read back from the
+        database. When the same number of turns with the same roles comes back, the local
+        entries (already part of the chat session) simply adopt the ids; otherwise they are
+        replaced. The chat session is only restarted when the history actually changed.
+
+        Args:
+            chat_history (list): Chat messages ordered oldest first. Messages are expected to have
+                `id`, `role`, `prompt` and `content` attributes; ones without an id are always appended.
+        """
+        with self._lock:
+            self._extend(chat_history)
+
+    def _extend(self, chat_history):
+        last_id = next((i for i in reversed(self.message_ids) if i is not None), self.context.summary_message_id)
+        new_messages = [
+            message for message in chat_history
+            if last_id is None or getattr(message, "id", None) is None or message.id > last_id
+        ]
+
+        # Split off the trailing turns that reply() added locally
+        unsynced = 0
+        while unsynced < len(self.message_ids) and self.message_ids[-1 - unsynced] is None:
+            unsynced += 1
+
+        roles = ["model" if message.role == "assistant" else "user" for message in new_messages]
+        if unsynced and roles[:unsynced] == [entry["role"] for entry in self.history[-unsynced:]]:
+            self.message_ids[-unsynced:] = [getattr(message, "id", None) for message in new_messages[:unsynced]]
+            new_messages, roles = new_messages[unsynced:], roles[unsynced:]
+            unsynced = 0
+
+        changed = bool(unsynced or new_messages)
+        if unsynced:
+            del self.history[-unsynced:]
+            del self.message_ids[-unsynced:]
+
+        for message, role in zip(new_messages, roles):
             self.history.append({
-                "role": "model" if message.role == "assistant" else "user",
+                "role": role,
                 "parts": [
                     message.prompt or message.content
                 ]
             })
+            self.message_ids.append(getattr(message, "id", None))
 
-        # Start the chat session with the provided history
+        if changed or self.chat_session is None:
+            self._start_session()
+
+    def context_history(self):
+        """Returns a snapshot of the history sent to the model: the rolling summary followed by the recent turns."""
+        with self._lock:
+            return self.context.prefix() + self.history
+
+    def _start_session(self):
+        """(Re)starts the chat session from the rolling summary and the current history."""
         self.chat_session = self.model.start_chat(
-            history=self.history,
+            history=self.context.prefix() + self.history,
         )
+        self._session_stale = False
+
+    def compact(self):
+        """
+        Folds the oldest turns into the rolling summary once the history exceeds the token budget.
+
+        The summary request runs without holding the history lock, and its result is only
+        applied if the folded turns are still at the start of the history. The chat session is
+        not restarted here, since a reply may be streaming from it; the next `reply()` does that.
+
+        Returns:
+            bool: Whether the history was compacted.
+        """
+        with self._lock:
+            count = self.context.fold_count(self.history, self.message_ids)
+            if not count or self._compacting:
+                return False
+            self._compacting = True
+            folded = self.history[:count]
+            message_id = self.message_ids[count - 1]
+            previous = self.context.summary
+
+        try:
+            summary = summarize(previous, folded)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+        with self._lock:
+            if self.message_ids[count - 1:count] != [message_id]:
+                return False
+            del self.history[:count]
+            del self.message_ids[:count]
+            self.context.summary = summary
+            self.context.summary_message_id = message_id
+            self._session_stale = True
+
+        if self.on_summary:
+            self.on_summary(summary, message_id)
+        return True
 
     def clear_response(self, response):
         """
@@ -72,54 +351,82 @@ Output template:
         Returns:
             str: Cleaned response text.
         """
-        POSSIBLE_INITIALS = [
-            "response:",
-            "response template:",
-            "output:",
-            "output template:",
-        ]
-
-        for p in POSSIBLE_INITIALS:
-            if response.lower().startswith(p):
-                response = response[len(p):].strip()
-        return response
+        return strip_prefixes(response).strip()
 
-    def get_title(self, message):
+    @metrics.timed("get_title")
+    def get_title(self, message, history=None):
         """
         Generates a short and engaging title for the chat based on the user's message.
 
         Args:
             message (str): User's message.
+            history (list, optional): History the title is based on. Defaults to the current chat history.
 
         Returns:
             str: Generated chat title.
         """
-        title_model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-thinking-exp-01-21",
-            generation_config=self.GEN_CONFIG,
-            system_instruction="""You are a content writer. Your task is to generate a short and engaging title for a chat. You don't need to do anything else. Stick to the task only. The chat title should also be related to the user's message. Follow the output template exactly.
+        if history is None:
+            history = self.context_history()
+
+        # Titles of new chats only depend on the first message, so they can be shared across chats
+        first_turn = not history and response_cache.enabled
+        if first_turn:
+            probability = get_prediction_proba(message)
+            title = response_cache.get("title", message, probability)
+            if title is not None:
+                return title
+
+        title_model = get_generative_model("title")
+        session = title_model.start_chat(
+            history=history,
+        )
+        title = self.clear_response(session.send_message(f"Message: {message}").text)
+        if first_turn:
+            response_cache.set("title", message, probability, title)
+        return title
 
-Input template:
+    def get_title_async(self, message, callback=None):
+        """
+        Generates the chat title in the background, off the reply path.
 
-Message: {user_message}
+        While a title request of this LLM is still running, it is returned instead of starting another.
 
-Output template:
+        Args:
+            message (str): User's message.
+            callback (callable, optional): Called with the generated title once it is ready, e.g. to save it.
 
-{generated_chat_title}""",
-        )
-        session = title_model.start_chat(
-            history=self.history,
-        )
-        return self.clear_response(session.send_message(f"Message: {message}").text)
+        Returns:
+            Future: Resolves to the generated title.
+        """
+        with self._lock:
+            if self._title_future is not None and not self._title_future.done():
+                return self._title_future
 
-    def reply(self, message, chat_id=None, func: callable=None):
+            # Snapshot the history now, before reply() appends the message being titled
+            history = self.context_history()
+
+            def generate():
+                title = self.get_title(message, history)
+                if callback:
+                    callback(title)
+                return title
+
+            self._title_future = executor.submit(generate)
+            return self._title_future
+
+    def reply(self, message, chat_id=None, func: callable=None, emotions=None):
         """
         Sends the user's message to the model and streams the response while tracking emotional context.
 
+        The emotion-annotated prompt is kept in `last_prompt`, so callers can persist the whole
+        exchange once the reply is complete, or the user's message alone when it fails
+        (see `database.db.save_exchange`). It is `None` until the message has been scored.
+
         Args:
             message (str): User's message.
             chat_id (optional): Optional identifier for chat sessions.
-            func (callable, optional): Optional callback function to handle chat updates.
+            func (callable, optional): Optional callback invoked as `func(chat_id, "user", message, prompt=prompt)` before the request is sent.
+            emotions (Future | dict, optional): Emotion probabilities of `message`, or a `score_emotions` future computing them. Scored here when omitted.
 
         Yields:
             str: Partial responses streamed from the model.
@@ -127,40 +434,171 @@ Output template:
         Returns:
             str: Final response message.
         """
-        probability = get_prediction_proba(message)
+        self.last_prompt = None
+        if emotions is None:
+            probability = get_prediction_proba(message)
+        elif isinstance(emotions, Future):
+            probability = emotions.result()
+        else:
+            probability = emotions
+        # The trend includes this message, but is only kept once the message was actually sent
+        trajectory = self.trajectory.updated(probability)
         prompt = f"""Message: {message}
 
 Emotions:
 {'\n'.join(f'{k.title()}: {v}%' for (k, v) in probability.items())}
+
+Emotional trend: {trajectory.trend()}
 """
+        self.last_prompt = prompt
         if chat_id and func:
             func(chat_id, "user", message, prompt=prompt)
         
-        self.history.append({
-            "role": "user",
-            "parts": [
-                prompt
-            ]
-        })
-
-        model_res = ""
-        response = self.chat_session.send_message(prompt, stream=True)
-        for chunk in response:
-            if chunk:
-                try:
-                    res = self.clear_response(chunk.text)
-                except ValueError:
-                    break
-
-                model_res += res
+        with self._lock:
+            # Compaction only marks the session stale; restarting it here never cuts off a streaming reply
+            if self._session_stale:
+                self._start_session()
+            chat_session = self.chat_session
+            first_turn = not self.history and self.context.summary is None
+            self.history.append({
+                "role": "user",
+                "parts": [
+                    prompt
+                ]
+            })
+            self.message_ids.append(None)
+
+        cached = response_cache.get("reply", message, probability) if first_turn else None
+        if cached is not None:
+            metrics.increment("response_cache_hits_total", kind="reply")
+            # Serve a common opener from the response cache; the session is restarted locally to include it
+            with self._lock:
+                self.history.append({
+                    "role": "model",
+                    "parts": [
+                        cached
+                    ]
+                })
+                self.message_ids.append(None)
+                self.trajectory = trajectory
+                self._start_session()
+            yield cached
+            return cached
+
+        assembler = StreamAssembler()
+        start = time.perf_counter()
+        first_chunk = True
+        try:
+            response = chat_session.send_message(prompt, stream=True)
+        except Exception:
+            metrics.increment("llm_errors_total", call="reply")
+            # Nothing was sent, so drop the user turn again and let the caller retry cleanly
+            with self._lock:
+                del self.history[-1]
+                del self.message_ids[-1]
+            raise
+        previous_trajectory, self.trajectory = self.trajectory, trajectory
+
+        # The session can only build its next request from a fully received reply; a blocked,
+        # cut-short or abandoned stream makes it raise BrokenResponseError/IncompleteIterationError
+        complete = synced = False
+        try:
+            for chunk in response:
+                if chunk:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        first_turn = False  # Never cache a reply that was cut short
+                        break
+
+                    if first_chunk:
+                        # Time to first token: request sent until Gemini's first streamed text arrived
+                        metrics.observe("llm_ttft_seconds", time.perf_counter() - start)
+                        first_chunk = False
+
+                    res = assembler.feed(text)
+                    if res:
+                        yield res
+            else:
+                complete = True
+
+            res = assembler.finish()
+            if res:
                 yield res
 
-        model_res = self.clear_response(model_res)
-        self.history.append({
-            "role": "model",
-            "parts": [
-                model_res
-            ]
-        })
+            model_res = assembler.text.strip()
+            metrics.observe("llm_stream_seconds", time.perf_counter() - start)
+            if first_turn:
+                response_cache.set("reply", message, probability, model_res)
+            with self._lock:
+                self.history.append({
+                    "role": "model",
+                    "parts": [
+                        model_res
+                    ]
+                })
+                self.message_ids.append(None)
+                over_budget = self.context.fold_count(self.history, self.message_ids) > 0
+            synced = complete
+        except Exception:
+            if first_chunk and not complete:
+                metrics.increment("llm_errors_total", call="reply")
+                # Nothing was received (e.g. a rate-limit error raised by the stream): undo the turn as when
+                # sending fails, so a retry neither duplicates the user turn nor counts its emotions twice
+                with self._lock:
+                    del self.history[-1]
+                    del self.message_ids[-1]
+                    self.trajectory = previous_trajectory
+            raise
+        finally:
+            if not synced:
+                # Rebuilt from `history` by the next reply
+                with self._lock:
+                    self._session_stale = True
+
+        # Summarize older turns off the reply path, so the next request stays within budget
+        if over_budget:
+            executor.submit(self.compact)
 
         return model_res
+
+# LLM instances kept per chat id across reruns, so history is extended instead of rebuilt
+llm_cache = LRUCache(
+    maxsize=int(os.getenv("LLM_CACHE_SIZE", 128)),
+    ttl=float(os.getenv("LLM_CACHE_TTL", 0)) or None,
+)
+
+def get_llm(chat_id, chat_history, summary=None, summary_message_id=None, on_summary=None, trajectory=None, older=None):
+    """
+    Returns the LLM for a chat, reusing the instance built on an earlier rerun when possible.
+
+    Args:
+        chat_id (int): Chat id.
+        chat_history (list): The chat's messages, oldest first.
+        summary (str, optional): Stored rolling summary, used when a new LLM is built.
+        summary_message_id (int, optional): Id of the last message covered by `summary`.
+        on_summary (callable, optional): Called as `on_summary(summary, message_id)` when the summary is updated.
+        trajectory (dict, optional): Stored emotion trajectory; replaces the cached one if it covers more messages.
+        older (callable, optional): Given when `chat_history` is a truncated page. Called as `older(summary_message_id)`
+            when a new LLM is built, it returns batches of the stored messages between the summary and `chat_history`,
+            which are folded into the summary (and saved through `on_summary`) instead of being dropped.
+
+    Returns:
+        LLM: An LLM whose history includes `chat_history`.
+    """
+    model = llm_cache.get(chat_id)
+    if model is None:
+        if older is not None:
+            folded, message_id = fold_messages(summary, older(summary_message_id))
+            if message_id is not None:
+                summary, summary_message_id = folded, message_id
+                if on_summary:
+                    on_summary(summary, summary_message_id)
+        model = LLM(chat_history, summary=summary, summary_message_id=summary_message_id, on_summary=on_summary, trajectory=trajectory)
+        llm_cache.set(chat_id, model)
+    else:
+        model.extend(chat_history)
+        if trajectory and trajectory.get("count", 0) > model.trajectory.count:
+            # Another process replied to this chat since the LLM was cached
+            model.trajectory = EmotionTrajectory.from_dict(trajectory)
+    return model
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Instrumentation of the hot path. METRICS_EXPORTERS is a comma-separated list of:
+# - prometheus: Prometheus text format, on METRICS_PORT (Streamlit app) or /metrics (API service)
+# - log: one JSON line with every metric logged every METRICS_LOG_INTERVAL seconds
+# Metrics are disabled when no exporter is configured; timers and counters then do nothing.
+EXPORTERS = [name.strip() for name in os.getenv("METRICS_EXPORTERS", "").split(",") if name.strip()]
+ENABLED = bool(EXPORTERS)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", 60))
+
+PREFIX = "anveshak"
+# Latency buckets in seconds, from cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+def _series(name, labels):
+    """Formats a metric name and its labels as a Prometheus series, e.g. `stage_seconds{stage="save_exchange"}`."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+class Histogram:
+    """Counts observations in fixed buckets, Prometheus-style."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+class Registry:
+    """Thread-safe store of counters, histograms and collected gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._collectors = []  # (name, callable returning a dict of gauge values)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def add_collector(self, name, collect):
+        with self._lock:
+            self._collectors.append((name, collect))
+
+    def _gauges(self):
+        """Calls the collectors; a failing collector is logged and skipped."""
+        gauges = {}
+        for name, collect in list(self._collectors):
+            try:
+                values = collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", name)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{name}_{key}"] = value
+        return gauges
+
+    def snapshot(self):
+        """
+        Returns every metric as plain values.
+
+        Returns:
+            dict: Counters, histogram summaries (count, sum, mean and max) and gauges, keyed by series.
+        """
+        with self._lock:
+            counters = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                _series(name, labels): {"count": h.count, "sum": h.sum, "mean": h.sum / h.count, "max": h.max}
+                for (name, labels), h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms, "gauges": self._gauges()}
+
+    def render_prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (series_name, labels), value in sorted(self._counters.items()):
+                    if series_name == name:
+                        lines.append(f"{_series(f'{PREFIX}_{name}', labels)} {value}")
+
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {PREFIX}_{name} histogram")
+                for (series_name, labels), h in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets + ("+Inf",), h.counts):
+                        cumulative += count
+                        lines.append(f"{_series(f'{PREFIX}_{name}_bucket', labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{_series(f'{PREFIX}_{name}_sum', labels)} {h.sum}")
+                    lines.append(f"{_series(f'{PREFIX}_{name}_count', labels)} {h.count}")
+
+        for name, value in sorted(self._gauges().items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def increment(name, amount=1, **labels):
+    """
+    Adds to a counter.
+
+    Args:
+        name (str): Counter name, ending in `_total` by convention.
+        amount (float, optional): Amount added. Defaults to 1.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        registry.increment(name, amount, **labels)
+
+def observe(name, value, **labels):
+    """
+    Records a value, typically a duration in seconds, in a histogram.
+
+    Args:
+        name (str): Histogram name, ending in `_seconds` for durations.
+        value (float): Observed value.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        registry.observe(name, value, **labels)
+
+@contextmanager
+def _stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.increment("stage_errors_total", stage=stage)
+        raise
+    finally:
+        registry.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+_NULL_TIMER = nullcontext()
+
+def timer(stage):
+    """
+    Times a block of code as a stage of the `stage_seconds` histogram; failures also count in `stage_errors_total`.
+
+    Usage:
+        with metrics.timer("save_exchange"):
+            ...
+
+    Args:
+        stage (str): Stage name, used as the `stage` label.
+
+    Returns:
+        A context manager; a shared no-op one when metrics are disabled.
+    """
+    return _stage_timer(stage) if ENABLED else _NULL_TIMER
+
+def timed(stage):
+    """
+    Decorator timing every call of a function as `stage` (see `timer`).
+
+    When metrics are disabled the function is returned undecorated, so it costs nothing.
+    """
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_collector(name, collect):
+    """
+    Registers a callable whose numeric results are exported as gauges `<name>_<key>` on every scrape or log line.
+
+    Args:
+        name (str): Gauge name prefix, e.g. `db_pool`.
+        collect (callable): Returns a dict of current values, e.g. `database.db.get_pool_stats`.
+    """
+    if ENABLED:
+        registry.add_collector(name, collect)
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text exposition format."""
+    return registry.render_prometheus()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves `render_prometheus()` on GET /metrics."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_prometheus_exporter(port=METRICS_PORT):
+    """Serves /metrics on `port` from a background thread."""
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Serving metrics on http://0.0.0.0:%s/metrics", port)
+
+def start_log_exporter(interval=METRICS_LOG_INTERVAL):
+    """Logs every metric as one JSON line every `interval` seconds from a background thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            logger.info("metrics %s", json.dumps(registry.snapshot(), sort_keys=True))
+
+    threading.Thread(target=loop, name="metrics-log", daemon=True).start()
+
+_started = False
+_start_lock = threading.Lock()
+
+def start_exporters(serve_http=True):
+    """
+    Starts the exporters listed in `METRICS_EXPORTERS`, once per process.
+
+    Args:
+        serve_http (bool, optional): Start the standalone Prometheus endpoint. Servers that expose
+            `render_prometheus()` on a route of their own (the API service) pass `False`.
+    """
+    global _started
+    with _start_lock:
+        if _started or not ENABLED:
+            return
+        _started = True
+
+    for name in EXPORTERS:
+        if name == "prometheus":
+            if serve_http:
+                start_prometheus_exporter()
+        elif name == "log":
+            start_log_exporter()
+        else:
+            logger.warning("Unknown metrics exporter %r", name)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import queue
+import threading
+import numpy as np
+from pathlib import Path
+from concurrent.futures import Future
+
+# CPU inference settings of the ONNX transformer backend (EMOTION_BACKEND=onnx)
+ONNX_THREADS = int(os.getenv("EMOTION_ONNX_THREADS", 0))  # 0 lets onnxruntime use every core
+ONNX_BATCH_SIZE = int(os.getenv("EMOTION_ONNX_BATCH_SIZE", 32))
+ONNX_MAX_WAIT_MS = float(os.getenv("EMOTION_ONNX_MAX_WAIT_MS", 5))
+ONNX_MAX_LENGTH = int(os.getenv("EMOTION_ONNX_MAX_LENGTH", 128))
+ONNX_QUANTIZED = os.getenv("EMOTION_ONNX_QUANTIZED", "true").lower() in ("1", "true", "yes")
+
+def softmax(logits):
+    """Row-wise softmax of a logits matrix."""
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class OnnxEmotionModel:
+    """
+    Transformer emotion classifier exported by `export_model.py --format onnx`, served with onnxruntime on CPU.
+
+    Exposes the same `predict_proba` / `classes_` interface as the scikit-learn pipeline.
+    Texts are tokenized without padding and scored in length-sorted batches padded only to
+    their longest member (dynamic padding). Small concurrent requests are merged into one
+    batch by a background thread, waiting at most `max_wait_ms` for company.
+    """
+
+    def __init__(self, path, threads=ONNX_THREADS, batch_size=ONNX_BATCH_SIZE, max_wait_ms=ONNX_MAX_WAIT_MS, max_length=ONNX_MAX_LENGTH, quantized=ONNX_QUANTIZED):
+        """
+        Loads an exported model directory.
+
+        Args:
+            path (str | Path): Directory holding `model.onnx` (and/or `model.int8.onnx`), `tokenizer.json` and `labels.json`, or one of its model files.
+            threads (int, optional): onnxruntime intra-op threads; `0` uses every core. Defaults to `EMOTION_ONNX_THREADS`.
+            batch_size (int, optional): Maximum texts per inference batch. Defaults to `EMOTION_ONNX_BATCH_SIZE`.
+            max_wait_ms (float, optional): How long a small request waits for others to batch with; `0` disables micro-batching.
+            max_length (int, optional): Tokens kept per text. Defaults to `EMOTION_ONNX_MAX_LENGTH`.
+            quantized (bool, optional): Prefer the int8-quantized model when present. Defaults to `EMOTION_ONNX_QUANTIZED`.
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        path = Path(path)
+        if path.suffix == ".onnx":
+            path, model_file = path.parent, path
+        else:
+            model_file = path / "model.int8.onnx"
+            if not (quantized and model_file.exists()):
+                model_file = path / "model.onnx"
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model_file = model_file
+
+        self.tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length)
+
+        meta = json.loads((path / "labels.json").read_text())
+        self.classes_ = np.array(meta["labels"], dtype=object)
+        self.pad_id = meta.get("pad_token_id", 0)
+
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def _infer(self, texts):
+        """Scores texts directly, in length-sorted batches with dynamic padding."""
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        probabilities = np.empty((len(encodings), len(self.classes_)))
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            length = max(len(encodings[i].ids) for i in batch)
+            input_ids = np.full((len(batch), length), self.pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), length), dtype=np.int64)
+            for row, i in enumerate(batch):
+                ids = encodings[i].ids
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+
+            inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                inputs["token_type_ids"] = np.zeros_like(input_ids)
+            logits = self.session.run(None, inputs)[0]
+            probabilities[batch] = softmax(logits)
+        return probabilities
+
+    def _batch_loop(self):
+        """Merges queued requests into batches of up to `batch_size` texts."""
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            try:
+                probabilities = self._infer([text for texts, _ in requests for text in texts])
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, future in requests:
+                future.set_result(probabilities[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def predict_proba(self, texts):
+        """
+        Predicts emotion probabilities.
+
+        Args:
+            texts (list[str]): Input texts.
+
+        Returns:
+            np.ndarray: A `(len(texts), len(classes_))` probability matrix.
+        """
+        texts = list(texts)
+        if not self.max_wait or len(texts) >= self.batch_size:
+            return self._infer(texts)
+
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._batch_loop, name="emotion-batcher", daemon=True)
+                    self._worker.start()
+
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import logging
+import threading
+from pathlib import Path
+from functools import lru_cache
+
+# Lemma table written by train.py for the training vocabulary
+LEMMAS_PATH = Path(os.getenv("EMOTION_LEMMAS_PATH", Path(__file__).resolve().parents[3] / "models" / "lemmas.json"))
+
+USERHANDLE_RE = re.compile(r"@\S+")  # Same pattern as neattext's remove_userhandles
+URL_RE = re.compile(r"http\S+|www\S+")
+NON_ALPHA_RE = re.compile(r"[^a-z]+")
+
+logger = logging.getLogger(__name__)
+
+# NLTK's English stopword list, embedded so serving never needs the NLTK corpora. Entries with
+# apostrophes are left out: the text is reduced to letters before stopwords are removed.
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him his himself she her hers
+herself it its itself they them their theirs themselves what which who whom this that these those am is
+are was were be been being have has had having do does did doing a an the and but if or because as until
+while of at by for with about against between into through during before after above below to from up
+down in out on off over under again further then once here there when where why how all any both each few
+more most other some such no nor not only own same so than too very s t can will just don should now d ll
+m o re ve y ain aren couldn didn doesn hadn hasn haven isn ma mightn mustn needn shan shouldn wasn weren won
+wouldn
+""".split())
+
+_lemmas = None
+_lemmas_lock = threading.Lock()
+
+def tokenize(text):
+    """
+    Splits a text into the tokens the emotion model sees, before lemmatization.
+
+    Lowercases the text, removes user handles and URLs, keeps letters only and drops stopwords.
+
+    Args:
+        text (str): The raw text.
+
+    Returns:
+        list[str]: Tokens in text order.
+    """
+    text = USERHANDLE_RE.sub(" ", text.lower())
+    text = URL_RE.sub("", text)
+    return [word for word in NON_ALPHA_RE.sub(" ", text).split() if word not in STOPWORDS]
+
+def build_lemma_table(words):
+    """
+    Lemmatizes a vocabulary with NLTK's WordNet lemmatizer.
+
+    Used at training time only, where the WordNet corpus is installed.
+
+    Args:
+        words (Iterable[str]): Distinct tokens.
+
+    Returns:
+        dict: Tokens mapped to their lemma, for tokens whose lemma differs.
+    """
+    from nltk.stem import WordNetLemmatizer
+
+    lemmatizer = WordNetLemmatizer()
+    table = {}
+    for word in words:
+        lemma = lemmatizer.lemmatize(word)
+        if lemma != word:
+            table[word] = lemma
+    return table
+
+def save_lemmas(table, path=LEMMAS_PATH):
+    """Writes a lemma table as JSON."""
+    Path(path).write_text(json.dumps(table, sort_keys=True))
+
+def set_lemmas(table):
+    """Replaces the process-wide lemma table, e.g. with a freshly built one during training."""
+    global _lemmas
+    with _lemmas_lock:
+        _lemmas = table
+    lemmatize.cache_clear()
+
+def get_lemmas():
+    """
+    Returns the process-wide lemma table, loading `LEMMAS_PATH` on first use.
+
+    Without a lemma table, tokens are left as they are and a warning is logged, since the
+    model then sees different text than it was trained on.
+    """
+    global _lemmas
+    if _lemmas is None:
+        with _lemmas_lock:
+            if _lemmas is None:
+                if LEMMAS_PATH.exists():
+                    _lemmas = json.loads(LEMMAS_PATH.read_text())
+                else:
+                    logger.warning("Lemma table %s not found, messages are not lemmatized; retrain with train.py to create it", LEMMAS_PATH)
+                    _lemmas = {}
+    return _lemmas
+
+@lru_cache(maxsize=65536)
+def lemmatize(word):
+    """Returns the lemma of a token from the lemma table (memoized)."""
+    return get_lemmas().get(word, word)
+
+def clean_text(text):
+    """
+    Cleans and preprocesses the input text by:
+    - Removing user handles
+    - Converting to lowercase
+    - Removing URLs
+    - Removing punctuation and numbers
+    - Lemmatizing words and removing stopwords
+
+    Training (`train.py`) and serving (`core.emotions`) share this function, so the model sees the same text in both.
+    """
+    return " ".join([lemmatize(word) for word in tokenize(text)])
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+from core.cache import LRUCache
+from core.emotions import normalize_text
+
+# Opt-in cache of first-turn titles and replies: "off", "memory", "file" or "db"
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "off").lower()
+RESPONSE_CACHE_REPLIES = os.getenv("RESPONSE_CACHE_REPLIES", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 86400)) or None
+RESPONSE_CACHE_BUCKET = float(os.getenv("RESPONSE_CACHE_BUCKET", 10))
+RESPONSE_CACHE_FILE = Path(os.getenv("RESPONSE_CACHE_FILE", Path(__file__).resolve().parents[3] / ".cache" / "response_cache.jsonl"))
+
+def cache_key(kind, message, emotions, bucket=RESPONSE_CACHE_BUCKET):
+    """
+    Builds the cache key of a first-turn request.
+
+    Messages are normalized like the emotion model input, and emotion percentages are
+    bucketed so small probability differences map to the same entry.
+
+    Args:
+        kind (str): What is cached, `"title"` or `"reply"`.
+        message (str): The first user message.
+        emotions (dict): Emotion percentages of `message`, as returned by `get_prediction_proba`.
+        bucket (float, optional): Bucket width in percentage points. Defaults to `RESPONSE_CACHE_BUCKET`.
+
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    buckets = ",".join(f"{name}:{int(value // bucket)}" for name, value in sorted(emotions.items()))
+    raw = f"{kind}\n{normalize_text(message)}\n{buckets}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class FileStore:
+    """
+    Persists cache entries in an append-only JSON lines file.
+
+    The file is read (and rewritten without expired or superseded entries) once on start-up.
+    """
+
+    def __init__(self, path, maxsize, ttl=None):
+        self.path = Path(path)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Reads the live entries from the file and compacts it.
+
+        Returns:
+            list[tuple]: `(key, value)` pairs, oldest first, at most `maxsize` of them.
+        """
+        if not self.path.exists():
+            return []
+
+        entries = {}
+        with self._lock, self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted process
+                entries.pop(record["key"], None)
+                entries[record["key"]] = record
+
+        now = time.time()
+        live = [r for r in entries.values() if not self.ttl or r["at"] + self.ttl > now][-self.maxsize:]
+
+        tmp = self.path.with_suffix(".tmp")
+        with self._lock:
+            with tmp.open("w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r) + "\n" for r in live)
+            tmp.replace(self.path)
+        return [(r["key"], r["value"]) for r in live]
+
+    def get(self, key):
+        return None  # Every live entry is loaded into memory up front
+
+    def set(self, key, value):
+        record = {"key": key, "value": value, "at": time.time()}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+class DatabaseStore:
+    """Persists cache entries in the `response_cache` table, shared by every app process."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+
+    def load(self):
+        return []
+
+    def get(self, key):
+        from database.db import get_cached_response
+        return get_cached_response(key, max_age=self.ttl)
+
+    def set(self, key, value):
+        from database.db import save_cached_response
+        save_cached_response(key, value)
+
+class ResponseCache:
+    """
+    Caches generated titles and first replies of new chats.
+
+    Lookups go to an in-process LRU first and then to the persistent store, if any.
+    Only first turns are cached: later turns depend on the whole conversation.
+    """
+
+    def __init__(self, backend=RESPONSE_CACHE, replies=RESPONSE_CACHE_REPLIES, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_FILE):
+        """
+        Initializes the cache.
+
+        Args:
+            backend (str, optional): `"off"`, `"memory"`, `"file"` or `"db"`. Defaults to `RESPONSE_CACHE`.
+            replies (bool, optional): Whether first replies are cached as well as titles. Defaults to `RESPONSE_CACHE_REPLIES`.
+            maxsize (int, optional): Entries kept in memory (and in the file). Defaults to `RESPONSE_CACHE_SIZE`.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to `RESPONSE_CACHE_TTL`.
+            path (Path, optional): File used by the `"file"` backend. Defaults to `RESPONSE_CACHE_FILE`.
+        """
+        if backend not in ("off", "memory", "file", "db"):
+            raise ValueError(f"Unknown RESPONSE_CACHE backend: {backend!r}")
+
+        self.enabled = backend != "off"
+        self.replies = self.enabled and replies
+        self.memory = LRUCache(maxsize=maxsize if self.enabled else 0, ttl=ttl)
+        self.store = None
+        if backend == "file":
+            self.store = FileStore(path, maxsize, ttl)
+        elif backend == "db":
+            self.store = DatabaseStore(ttl)
+        self._loaded = self.store is None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if not self._loaded:
+                for key, value in self.store.load():
+                    self.memory.set(key, value)
+                self._loaded = True
+
+    def get(self, kind, message, emotions):
+        """
+        Looks up a cached title or reply.
+
+        Args:
+            kind (str): `"title"` or `"reply"`.
+            message (str): The first user message.
+            emotions (dict): Emotion percentages of `message`.
+
+        Returns:
+            str | None: The cached text, or `None` on a miss or when caching `kind` is disabled.
+        """
+        if not self.enabled or (kind == "reply" and not self.replies):
+            return None
+        if not self._loaded:
+            self._load()
+
+        key = cache_key(kind, message, emotions)
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, kind, message, emotions, value):
+        """Stores a generated title or reply; empty values are not cached."""
+        if not self.enabled or not value or (kind == "reply" and not self.replies):
+            return
+        if not self._loaded:
+            self._load()
+
+        key = cache_key(kind, message, emotions)
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+# Process-wide response cache configured from the environment
+response_cache = ResponseCache()
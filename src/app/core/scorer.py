@@ -0,0 +1,189 @@
+import re
+import json
+import numpy as np
+from collections import Counter
+
+# Classifiers whose predict_proba is softmax(X @ W + b) over a TF-IDF matrix X
+SUPPORTED_CLASSIFIERS = ("LogisticRegression", "MultinomialNB")
+
+class CompiledScorer:
+    """
+    Standalone NumPy scorer for a fitted TF-IDF + linear classifier pipeline.
+
+    Holds the vocabulary hash table, IDF vector and a `(n_features, n_classes)` weight
+    matrix, and reproduces the pipeline's `predict_proba` as a sparse dot product plus a
+    softmax. Loading and scoring need only NumPy, not scikit-learn.
+    """
+
+    def __init__(self, terms, idf, weights, bias, classes, config):
+        """
+        Initializes the scorer from its exported arrays.
+
+        Args:
+            terms (list[str]): Vocabulary terms ordered by feature index.
+            idf (np.ndarray | None): IDF weight per feature, or `None` when the vectorizer does not use IDF.
+            weights (np.ndarray): `(n_features, n_classes)` classifier weights.
+            bias (np.ndarray): Per-class intercept.
+            classes (np.ndarray): Class labels, in column order.
+            config (dict): Vectorizer settings (`lowercase`, `token_pattern`, `ngram_range`, `binary`, `sublinear_tf`, `norm`).
+        """
+        self.vocabulary = {term: idx for idx, term in enumerate(terms)}
+        self.idf = idf
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.classes_ = classes
+        self.config = config
+
+        self._token_re = re.compile(config["token_pattern"])
+        self._min_n, self._max_n = config["ngram_range"]
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Compiles a fitted `Pipeline([("tfidf", TfidfVectorizer()), (name, classifier)])`.
+
+        The pipeline is only inspected through its fitted attributes, so scikit-learn
+        is not imported here.
+
+        Args:
+            pipeline: Fitted scikit-learn pipeline with a TF-IDF vectorizer followed by a
+                multinomial `LogisticRegression` or a `MultinomialNB`.
+
+        Returns:
+            CompiledScorer: The compiled scorer.
+
+        Raises:
+            ValueError: If the pipeline uses a step or setting the scorer cannot reproduce.
+        """
+        steps = list(pipeline.named_steps.values())
+        if len(steps) != 2:
+            raise ValueError(f"Expected a vectorizer and a classifier, got {len(steps)} steps")
+        vectorizer, classifier = steps
+
+        if type(vectorizer).__name__ != "TfidfVectorizer":
+            raise ValueError(f"Unsupported vectorizer: {type(vectorizer).__name__}")
+        if vectorizer.analyzer != "word" or vectorizer.tokenizer or vectorizer.preprocessor or vectorizer.strip_accents or vectorizer.stop_words:
+            raise ValueError("Only the default word analyzer without custom tokenizer, preprocessor, accent stripping or stop words is supported")
+
+        name = type(classifier).__name__
+        if name == "LogisticRegression":
+            if getattr(classifier, "multi_class", "auto") == "ovr":
+                raise ValueError("One-vs-rest LogisticRegression is not supported")
+            weights, bias = classifier.coef_, classifier.intercept_
+            if weights.shape[0] == 1:
+                # Binary logistic regression: sigmoid(z) == softmax([0, z])[1]
+                weights = np.vstack([np.zeros_like(weights), weights])
+                bias = np.concatenate([[0.0], bias])
+        elif name == "MultinomialNB":
+            weights, bias = classifier.feature_log_prob_, classifier.class_log_prior_
+        else:
+            raise ValueError(f"Unsupported classifier: {name}, expected one of {SUPPORTED_CLASSIFIERS}")
+
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        config = {
+            "lowercase": vectorizer.lowercase,
+            "token_pattern": vectorizer.token_pattern,
+            "ngram_range": list(vectorizer.ngram_range),
+            "binary": vectorizer.binary,
+            "sublinear_tf": vectorizer.sublinear_tf,
+            "norm": vectorizer.norm,
+        }
+        return cls(
+            terms=terms,
+            idf=np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None,
+            weights=np.asarray(weights).T,
+            bias=bias,
+            classes=np.asarray(classifier.classes_),
+            config=config,
+        )
+
+    def save(self, path):
+        """Writes the scorer to an uncompressed `.npz` file."""
+        # Terms never contain newlines, so the vocabulary is stored as one UTF-8 buffer
+        terms = "\n".join(sorted(self.vocabulary, key=self.vocabulary.get))
+        arrays = {
+            "terms": np.frombuffer(terms.encode("utf-8"), dtype=np.uint8),
+            "weights": self.weights,
+            "bias": self.bias,
+            "classes": np.asarray(self.classes_, dtype=str),
+            "config": np.array(json.dumps(self.config)),
+        }
+        if self.idf is not None:
+            arrays["idf"] = self.idf
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a scorer written by `save`."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=data["terms"].tobytes().decode("utf-8").split("\n"),
+                idf=data["idf"] if "idf" in data.files else None,
+                weights=data["weights"],
+                bias=data["bias"],
+                classes=data["classes"].astype(object),
+                config=json.loads(data["config"].item()),
+            )
+
+    def _analyze(self, text):
+        """Splits a text into the word n-grams produced by the fitted vectorizer."""
+        if self.config["lowercase"]:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self._max_n == 1:
+            return tokens
+
+        ngrams = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), self._max_n + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def _features(self, text):
+        """Returns the non-zero feature indices and TF-IDF values of a text."""
+        vocabulary = self.vocabulary
+        counts = Counter(idx for idx in map(vocabulary.get, self._analyze(text)) if idx is not None)
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+        if self.config["binary"]:
+            values[:] = 1.0
+        elif self.config["sublinear_tf"]:
+            values = np.log(values) + 1.0
+        if self.idf is not None:
+            values *= self.idf[indices]
+
+        norm = self.config["norm"]
+        if norm == "l2":
+            length = np.sqrt(values @ values)
+        elif norm == "l1":
+            length = np.abs(values).sum()
+        else:
+            length = 0.0
+        if length > 0:
+            values /= length
+        return indices, values
+
+    def decision_function(self, texts):
+        """Returns the `(len(texts), n_classes)` matrix of class scores before the softmax."""
+        scores = np.tile(self.bias, (len(texts), 1))
+        for row, text in enumerate(texts):
+            indices, values = self._features(text)
+            if len(indices):
+                scores[row] += values @ self.weights[indices]
+        return scores
+
+    def predict_proba(self, texts):
+        """
+        Predicts class probabilities for the given texts.
+
+        Args:
+            texts (list[str]): Texts to classify.
+
+        Returns:
+            np.ndarray: `(len(texts), n_classes)` probability matrix, matching the compiled pipeline's `predict_proba`.
+        """
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
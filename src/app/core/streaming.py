@@ -0,0 +1,114 @@
+import time
+
+# Template labels the model sometimes puts in front of its reply
+RESPONSE_PREFIXES = (
+    "response:",
+    "response template:",
+    "output:",
+    "output template:",
+)
+
+def strip_prefixes(text, prefixes=RESPONSE_PREFIXES):
+    """
+    Removes template labels like 'response:' or 'output:' from the start of a text.
+
+    Args:
+        text (str): The raw text.
+        prefixes (tuple[str], optional): Lowercase labels to remove. Defaults to `RESPONSE_PREFIXES`.
+
+    Returns:
+        str: Text without leading labels.
+    """
+    for p in prefixes:
+        if text.lower().startswith(p):
+            text = text[len(p):].lstrip()
+    return text
+
+class StreamAssembler:
+    """
+    Assembles a streamed reply in linear time.
+
+    Template labels are stripped once, at the start of the stream: the first characters are
+    held back only while they could still turn into a label. Chunks are collected in a list
+    and joined once, instead of growing a string chunk by chunk.
+    """
+
+    def __init__(self, prefixes=RESPONSE_PREFIXES):
+        self.prefixes = prefixes
+        self._parts = []
+        self._head = ""
+        self._started = False
+
+    def feed(self, chunk):
+        """
+        Adds a streamed chunk.
+
+        Args:
+            chunk (str): Raw chunk text.
+
+        Returns:
+            str: Text ready to display, empty while the start of the stream is held back.
+        """
+        if self._started:
+            self._parts.append(chunk)
+            return chunk
+
+        self._head += chunk
+        head = self._head.lstrip().lower()
+        if any(len(head) < len(p) and p.startswith(head) for p in self.prefixes):
+            return ""
+        return self._release()
+
+    def finish(self):
+        """
+        Ends the stream.
+
+        Returns:
+            str: Any text still held back.
+        """
+        return "" if self._started else self._release()
+
+    def _release(self):
+        self._started = True
+        text = strip_prefixes(self._head.lstrip(), self.prefixes)
+        self._parts.append(text)
+        return text
+
+    @property
+    def text(self):
+        """The reply assembled so far."""
+        return "".join(self._parts)
+
+class RenderThrottle:
+    """Decides when a streaming UI should re-render, by elapsed time or amount of new text."""
+
+    def __init__(self, interval=0.1, max_chars=512):
+        """
+        Initializes the throttle.
+
+        Args:
+            interval (float, optional): Minimum seconds between renders. Defaults to 0.1.
+            max_chars (int, optional): New characters that force a render regardless of time. Defaults to 512.
+        """
+        self.interval = interval
+        self.max_chars = max_chars
+        self._last = 0.0
+        self._pending = 0
+
+    def due(self, new_text):
+        """
+        Records newly streamed text and returns whether a render is due now.
+
+        Args:
+            new_text (str): Text added since the previous call.
+
+        Returns:
+            bool: Whether the caller should render.
+        """
+        self._pending += len(new_text)
+        now = time.monotonic()
+        if self._pending and (now - self._last >= self.interval or self._pending >= self.max_chars):
+            self._last = now
+            self._pending = 0
+            return True
+        return False
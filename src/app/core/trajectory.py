@@ -0,0 +1,117 @@
+import os
+from collections import deque
+
+# Weight of the newest message in the moving average, and how many dominant emotions are remembered
+TRAJECTORY_ALPHA = float(os.getenv("EMOTION_TRAJECTORY_ALPHA", 0.3))
+TRAJECTORY_HISTORY = int(os.getenv("EMOTION_TRAJECTORY_HISTORY", 20))
+
+class EmotionTrajectory:
+    """
+    Running emotion aggregates of a chat: an exponential moving average, per-emotion
+    minimum and maximum, and a bounded history of dominant emotions.
+
+    Every update costs O(number of emotions), independent of the chat's length, and the
+    whole state serializes to a small JSON object stored on the chat.
+    """
+
+    def __init__(self, alpha=TRAJECTORY_ALPHA, history_size=TRAJECTORY_HISTORY):
+        """
+        Initializes an empty trajectory.
+
+        Args:
+            alpha (float, optional): Weight of the newest message in the moving average. Defaults to `EMOTION_TRAJECTORY_ALPHA`.
+            history_size (int, optional): Dominant emotions remembered. Defaults to `EMOTION_TRAJECTORY_HISTORY`.
+        """
+        self.alpha = alpha
+        self.count = 0
+        self.ema = {}
+        self.delta = {}  # Change of the moving average caused by the latest message
+        self.min = {}
+        self.max = {}
+        self.dominant = deque(maxlen=history_size)
+
+    def update(self, probability):
+        """
+        Adds a message's emotion percentages.
+
+        Args:
+            probability (dict): Emotion percentages, as returned by `get_prediction_proba`.
+        """
+        for name, value in probability.items():
+            value = float(value)
+            previous = self.ema.get(name)
+            self.ema[name] = value if previous is None else previous + self.alpha * (value - previous)
+            self.delta[name] = 0.0 if previous is None else self.ema[name] - previous
+            self.min[name] = min(self.min.get(name, value), value)
+            self.max[name] = max(self.max.get(name, value), value)
+        self.dominant.append(max(probability, key=probability.get))
+        self.count += 1
+
+    def updated(self, probability):
+        """Returns a copy of the trajectory with `probability` added, leaving this one unchanged."""
+        trajectory = EmotionTrajectory.from_dict(self.to_dict(), self.alpha)
+        trajectory.update(probability)
+        return trajectory
+
+    def mood(self):
+        """Returns the emotion with the highest moving average, or `None` before the first message."""
+        return max(self.ema, key=self.ema.get) if self.ema else None
+
+    def trend(self, top=2):
+        """
+        Describes the emotional trend of the chat in one line.
+
+        Args:
+            top (int, optional): Number of rising and falling emotions mentioned. Defaults to 2.
+
+        Returns:
+            str: e.g. `"Mostly sadness; rising: joy (+6.1); falling: sadness (-4.2); recent: sadness, sadness, joy"`.
+        """
+        if not self.count:
+            return "No earlier messages"
+
+        moves = sorted(self.delta.items(), key=lambda item: item[1])
+        rising = [f"{name} (+{value:.1f})" for name, value in reversed(moves[-top:]) if value >= 0.5]
+        falling = [f"{name} ({value:.1f})" for name, value in moves[:top] if value <= -0.5]
+
+        parts = [f"Mostly {self.mood()}"]
+        if rising:
+            parts.append(f"rising: {', '.join(rising)}")
+        if falling:
+            parts.append(f"falling: {', '.join(falling)}")
+        parts.append(f"recent: {', '.join(list(self.dominant)[-5:])}")
+        return "; ".join(parts)
+
+    def to_dict(self):
+        """Returns the JSON-serializable state stored in `Chat.emotion_trajectory`."""
+        return {
+            "count": self.count,
+            "ema": dict(self.ema),
+            "delta": dict(self.delta),
+            "min": dict(self.min),
+            "max": dict(self.max),
+            "dominant": list(self.dominant),
+            "history_size": self.dominant.maxlen,
+        }
+
+    @classmethod
+    def from_dict(cls, state, alpha=TRAJECTORY_ALPHA):
+        """
+        Restores a trajectory from `to_dict()` output.
+
+        Args:
+            state (dict | None): Stored state; `None` gives an empty trajectory.
+            alpha (float, optional): Weight of the newest message in the moving average.
+
+        Returns:
+            EmotionTrajectory: The restored trajectory.
+        """
+        state = state or {}
+        trajectory = cls(alpha, state.get("history_size", TRAJECTORY_HISTORY))
+        trajectory.count = state.get("count", 0)
+        trajectory.ema = dict(state.get("ema", {}))
+        trajectory.delta = dict(state.get("delta", {}))
+        trajectory.min = dict(state.get("min", {}))
+        trajectory.max = dict(state.get("max", {}))
+        trajectory.dominant.extend(state.get("dominant", []))
+        return trajectory
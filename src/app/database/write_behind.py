@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Rewrite the spool once it grows past this size while writes are still pending
+SPOOL_COMPACT_BYTES = 8 * 2 ** 20
+# Writes that can never be stored are kept in this subdirectory of the spool directory
+DEAD_LETTER_DIR = "dead-letters"
+
+class _Entry:
+    """A queued write: the in-memory item handed to the flush function and its spooled form."""
+
+    __slots__ = ("seq", "item", "payload", "size", "queued_at")
+
+    def __init__(self, seq, item, payload, size):
+        self.seq = seq
+        self.item = item
+        self.payload = payload
+        self.size = size
+        self.queued_at = time.monotonic()
+
+def _open_locked(path, mode):
+    """
+    Opens a spool file and takes an exclusive lock on it, marking its owner as alive.
+
+    `fcntl` is imported here, so the database module still imports on platforms without it
+    as long as write-behind stays disabled.
+    """
+    import fcntl
+
+    file = open(path, mode, encoding="utf-8")
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return file
+
+class WriteBehindQueue:
+    """
+    Buffers writes in memory and persists them in batches from a background thread.
+
+    Every write is appended to a local spool file (JSON lines) before `put` returns, and a
+    marker is appended once it is committed, so writes that were queued but not stored when
+    the process died can be replayed with `recover`. The spool is locked while the queue runs,
+    so `recover` leaves the spools of running processes alone, and truncated whenever the
+    queue drains.
+
+    Writes stay in the queue, visible through `pending()`, until they are committed. A batch
+    is flushed `interval` seconds after its oldest write was queued, or as soon as `batch_rows`
+    rows are waiting. Failed batches are retried with a capped backoff for as long as it takes;
+    meanwhile `put` blocks once `max_rows` rows are pending. Only writes failing with one of
+    the `permanent` errors on their own are moved to a dead-letter file instead.
+    """
+
+    def __init__(self, flush, spool_path, interval=0.05, batch_rows=500, max_rows=10000, fsync=False, permanent=(), on_dead_letter=None, max_backoff=5.0):
+        """
+        Starts the queue's worker thread.
+
+        Args:
+            flush (callable): Persists a list of queued items, in queue order, in one transaction.
+            spool_path (str | Path): Spool file of this process.
+            interval (float, optional): Seconds a write waits for others to batch with. Defaults to 0.05.
+            batch_rows (int, optional): Rows that trigger a flush, and the maximum flushed at once. Defaults to 500.
+            max_rows (int, optional): Rows pending before `put` blocks. Defaults to 10000.
+            fsync (bool, optional): fsync the spool on every write, so writes also survive a host crash. Defaults to False.
+            permanent (tuple[type], optional): Exceptions meaning a write can never be stored (e.g. integrity errors),
+                as opposed to the database being unavailable.
+            on_dead_letter (callable, optional): Called with each item moved to the dead-letter file.
+            max_backoff (float, optional): Longest pause between retries of a failed batch, in seconds. Defaults to 5.
+        """
+        self.flush = flush
+        self.interval = interval
+        self.batch_rows = batch_rows
+        self.max_rows = max_rows
+        self.fsync = fsync
+        self.permanent = tuple(permanent)
+        self.on_dead_letter = on_dead_letter
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._pending = []  # _Entry objects in queue order
+        self._rows = 0
+        self._seq = 0
+        self._closed = False
+        self._draining = False
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failed_attempts = 0
+        self.dead_letters = 0
+
+        self.spool_path = Path(spool_path)
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dead_letter_path = self.spool_path.parent / DEAD_LETTER_DIR / self.spool_path.name
+        self._spool = _open_locked(self.spool_path, "a")
+
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+
+    def _spool_line(self, record):
+        self._spool.write(json.dumps(record) + "\n")
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def put(self, item, payload, size=1):
+        """
+        Queues a write.
+
+        Args:
+            item: The object passed to the flush function.
+            payload (dict): JSON-serializable form of the write, spooled for `recover`.
+            size (int, optional): Number of rows the write adds. Defaults to 1.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The write-behind queue is closed")
+            # Backpressure: bound memory by waiting for the worker to catch up
+            while self._pending and self._rows + size > self.max_rows:
+                self._cond.wait()
+            self._seq += 1
+            self._spool_line({"seq": self._seq, "write": payload})
+            self._pending.append(_Entry(self._seq, item, payload, size))
+            self._rows += size
+            self._cond.notify_all()
+
+    def pending(self):
+        """Returns the queued items that are not committed yet, in queue order."""
+        with self._cond:
+            return [entry.item for entry in self._pending]
+
+    def _next_batch(self):
+        """Waits until a batch is due and returns it, or `None` once the queue is closed and empty."""
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            deadline = self._pending[0].queued_at + self.interval
+            while self._rows < self.batch_rows and not (self._closed or self._draining):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, rows = [], 0
+            for entry in self._pending:
+                if batch and rows + entry.size > self.batch_rows:
+                    break
+                batch.append(entry)
+                rows += entry.size
+            return batch
+
+    def _flush_batch(self, batch):
+        """
+        Tries to store a batch once.
+
+        Returns:
+            tuple[list, list]: The entries committed and the entries that can never be stored.
+        """
+        try:
+            self.flush([entry.item for entry in batch])
+            return batch, []
+        except self.permanent:
+            if len(batch) == 1:
+                logger.exception("Write-behind write %s cannot be stored", batch[0].seq)
+                return [], batch
+            logger.warning("Write-behind batch of %s writes was rejected, storing them one by one", len(batch))
+
+        # Isolate the writes the database rejects, so they do not block the ones behind them
+        committed, dead = [], []
+        for entry in batch:
+            try:
+                self.flush([entry.item])
+                committed.append(entry)
+            except self.permanent:
+                logger.exception("Write-behind write %s cannot be stored", entry.seq)
+                dead.append(entry)
+            except Exception:
+                break  # The database became unavailable; the rest is retried with the next batch
+        return committed, dead
+
+    def _run(self):
+        failures = 0
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                committed, dead = self._flush_batch(batch)
+            except Exception:
+                # Transient failure (e.g. the database is down): keep the batch pending and spooled
+                failures += 1
+                logger.exception("Write-behind flush of %s writes failed (attempt %s), retrying", len(batch), failures)
+                with self._cond:
+                    self.failed_attempts += 1
+                    self._cond.wait(min(0.1 * 2 ** (failures - 1), self.max_backoff))
+                continue
+            failures = 0
+
+            for entry in dead:
+                self._dead_letter(entry)
+            self._remove(committed + dead)
+
+    def _remove(self, entries):
+        """Removes stored (or dead-lettered) entries from the queue and records them in the spool."""
+        if not entries:
+            return
+        done = {entry.seq for entry in entries}
+        with self._cond:
+            self._pending = [entry for entry in self._pending if entry.seq not in done]
+            self._rows -= sum(entry.size for entry in entries)
+            self.flushed_batches += 1
+            self.flushed_rows += sum(entry.size for entry in entries)
+            if not self._pending:
+                self._spool.seek(0)
+                self._spool.truncate()
+            elif self._spool.tell() > SPOOL_COMPACT_BYTES:
+                self._compact()
+            else:
+                self._spool_line({"done": sorted(done)})
+            self._cond.notify_all()
+
+    def _dead_letter(self, entry):
+        """Appends a write that can never be stored to this process's dead-letter file."""
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"seq": entry.seq, "write": entry.payload}) + "\n")
+        self.dead_letters += 1
+        if self.on_dead_letter:
+            self.on_dead_letter(entry.item)
+
+    def _compact(self):
+        """Rewrites the spool with only the pending writes."""
+        tmp = self.spool_path.with_suffix(".tmp")
+        file = _open_locked(tmp, "w")
+        for entry in self._pending:
+            file.write(json.dumps({"seq": entry.seq, "write": entry.payload}) + "\n")
+        file.flush()
+        os.replace(tmp, self.spool_path)
+        self._spool.close()
+        self._spool = file
+
+    def drain(self, timeout=None):
+        """
+        Flushes every pending write without waiting for the batching interval.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most.
+
+        Returns:
+            bool: Whether the queue is empty.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            self._draining = True
+            self._cond.notify_all()
+            try:
+                while self._pending:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                return not self._pending
+            finally:
+                self._draining = False
+
+    def close(self, timeout=10.0):
+        """
+        Flushes pending writes and stops the worker (registered with `atexit` by the database module).
+
+        Writes that cannot be stored within `timeout` stay in the spool for `recover`.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.warning("Write-behind queue closed with %s writes left in %s", len(self._pending), self.spool_path)
+            return
+        with self._cond:
+            if not self._pending:
+                self.spool_path.unlink(missing_ok=True)
+            self._spool.close()
+
+    def stats(self):
+        """Returns the queue depth and flush counters."""
+        with self._cond:
+            return {
+                "pending_writes": len(self._pending),
+                "pending_rows": self._rows,
+                "flushed_batches": self.flushed_batches,
+                "flushed_rows": self.flushed_rows,
+                "failed_attempts": self.failed_attempts,
+                "dead_letters": self.dead_letters,
+            }
+
+def recover(spool_dir, replay):
+    """
+    Replays the writes left unstored in the spool files of processes that are gone, then removes the files.
+
+    Spools still locked by a running queue (in this or another process) are skipped.
+
+    Args:
+        spool_dir (str | Path): Directory holding the spool files (`*.jsonl`).
+        replay (callable): Stores a list of spooled payloads, oldest first.
+
+    Returns:
+        int: Number of writes replayed.
+    """
+    spool_dir = Path(spool_dir)
+    if not spool_dir.is_dir():
+        return 0
+
+    replayed = 0
+    for path in sorted(spool_dir.glob("*.jsonl")):
+        try:
+            file = _open_locked(path, "r")
+        except BlockingIOError:
+            continue  # Its owner is still running
+        except FileNotFoundError:
+            continue
+
+        with file:
+            # The owner may have replaced the file while it was being opened (see `_compact`)
+            try:
+                if os.fstat(file.fileno()).st_ino != os.stat(path).st_ino:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            writes, done = [], set()
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line torn by the crash
+                if "done" in record:
+                    done.update(record["done"])
+                else:
+                    writes.append(record)
+
+            payloads = [record["write"] for record in writes if record["seq"] not in done]
+            if payloads:
+                logger.warning("Replaying %s unstored writes from %s", len(payloads), path)
+                replay(payloads)
+                replayed += len(payloads)
+            path.unlink()
+    return replayed
@@ -2,20 +2,49 @@ import os
 import uuid
 import logging
 import datetime
+import functools
 import streamlit as st
 import extra_streamlit_components as stx
 
-from core.llm_response import LLM
-from database.db import create_new_chat, delete_chat, get_chat_messages, get_chat_title, get_chats_by_session_id, save_chat_title, save_message
-
-# Configure logging
+from core import metrics
+from core.llm_response import get_llm, llm_cache, score_emotions
+from core.streaming import RenderThrottle
+from core.trajectory import EmotionTrajectory
+from database.db import create_new_chat, delete_chat, get_chat, get_chat_messages_page, get_chat_summary, get_chat_title, get_recent_chats, iter_chat_messages, recover_writes, save_chat_summary, save_chat_title, save_exchange
+
+# Upper bounds on what a rerun loads: sidebar chats and the most recent messages of the open chat
+CHAT_LIST_LIMIT = int(os.getenv("CHAT_LIST_LIMIT", 50))
+MESSAGE_HISTORY_LIMIT = int(os.getenv("MESSAGE_HISTORY_LIMIT", 200))
+
+# Streaming re-render throttle: at most one re-render per interval, unless this many characters piled up
+STREAM_RENDER_INTERVAL = float(os.getenv("STREAM_RENDER_INTERVAL", 0.1))
+STREAM_RENDER_CHARS = int(os.getenv("STREAM_RENDER_CHARS", 512))
+
+# Sidebar mood indicator of a chat's dominant emotion (moving average)
+MOOD_EMOJIS = {
+    "anger": "😠",
+    "disgust": "🤢",
+    "fear": "😨",
+    "joy": "😄",
+    "neutral": "😐",
+    "sadness": "😢",
+    "shame": "😳",
+    "surprise": "😲",
+}
+
+# Configure logging; the metrics log exporter writes through it as well
 logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 logger = logging.getLogger(__name__)
 
+# Start the exporters listed in METRICS_EXPORTERS (once per process, not once per rerun)
+metrics.start_exporters()
+# Store messages that a crashed process had queued with write-behind (also once per process)
+recover_writes()
+
 # Streamlit page configuration
 st.set_page_config(
     page_title="Anveshak Neo",
@@ -25,6 +54,11 @@ st.set_page_config(
 )
 mainTitle = st.title("Anveshak Neo 🤖")
 
+def chat_trajectory(chat_id):
+    """Returns the stored emotion trajectory of a chat, preferring the sidebar's cached chat list."""
+    chat = next((c for c in user_chats if c.id == chat_id), None) or get_chat(chat_id)
+    return chat.emotion_trajectory if chat else None
+
 def get_manager():
     return stx.CookieManager()
 
@@ -57,8 +91,8 @@ description = st.markdown("""
 To start a new conversation, simply click the **"Start New Chat"** button in the sidebar. This will create a fresh chat session, separate from previous discussions. Each chat is stored in the database, ensuring that you can return to past conversations anytime.
 """)
 
-# Retrieve all chats for the current persistent session
-user_chats = get_chats_by_session_id(session_id)
+# Retrieve the most recent chats for the current persistent session
+user_chats = get_recent_chats(session_id, limit=CHAT_LIST_LIMIT)
 
 # Initialize session state for selected chat
 if "selected_chat_id" not in st.session_state:
@@ -70,6 +104,9 @@ if user_chats:
     for chat in user_chats:
         col1, col2 = st.sidebar.columns([3, 1])
         title = chat.title or f"{chat.created_at.strftime('%d-%m-%Y')}"
+        mood = EmotionTrajectory.from_dict(chat.emotion_trajectory).mood()
+        if mood in MOOD_EMOJIS:
+            title = f"{MOOD_EMOJIS[mood]} {title}"
         if col1.button(title, key=f"chat-{count}"):
             st.session_state.selected_chat_id = chat.id
 
@@ -82,6 +119,7 @@ if user_chats:
         # Delete chat button functionality
         if col2.button("❌", key=f"delete_{chat.id}"):
             delete_chat(chat.id)
+            llm_cache.pop(chat.id)
             if st.session_state.selected_chat_id == chat.id:
                 st.session_state.selected_chat_id = None
             st.rerun()
@@ -100,7 +138,7 @@ if "messages" not in st.session_state:
 
 # Display messages for the selected chat
 if st.session_state.selected_chat_id:
-    chat_messages = get_chat_messages(st.session_state.selected_chat_id)
+    chat_messages = get_chat_messages_page(st.session_state.selected_chat_id, limit=MESSAGE_HISTORY_LIMIT)
     with st.chat_message("assistant", avatar="🤖"):
         st.markdown("**Anveshak Neo:**\n\nHi, I'm Anveshak. How can I help you?")
 
@@ -110,44 +148,85 @@ if st.session_state.selected_chat_id:
             role_prefix = "**Mr. GenZ:**\n\n" if message.role == "user" else "**Anveshak Neo:**\n\n"
             st.markdown(role_prefix + message.content)
 
-    # Initialize the AI model with chat history
-    model = LLM(chat_messages)
-    
     # Input field for user messages
     if prompt := st.chat_input("Message Anveshak"):
+        # Score emotions in the background while the chat session is prepared
+        emotions = score_emotions(prompt)
+
+        # Reuse the AI model of this chat from earlier reruns, extended with any new messages.
+        # Older turns live in a rolling summary that the model keeps up to date in the database.
+        summary, summary_message_id = get_chat_summary(st.session_state.selected_chat_id)
+        model = get_llm(
+            st.session_state.selected_chat_id,
+            chat_messages,
+            summary=summary,
+            summary_message_id=summary_message_id,
+            on_summary=functools.partial(save_chat_summary, st.session_state.selected_chat_id),
+            trajectory=chat_trajectory(st.session_state.selected_chat_id),
+            # A full page may have left older turns out; they are folded into the summary
+            older=functools.partial(
+                iter_chat_messages,
+                st.session_state.selected_chat_id,
+                before=(chat_messages[0].timestamp, chat_messages[0].id),
+            ) if len(chat_messages) >= MESSAGE_HISTORY_LIMIT else None,
+        )
+
         with st.chat_message("user", avatar="😎"):
             st.markdown("**Mr. GenZ:**\n\n" + prompt)
 
         # Process AI response
-        header = full_response = "**Anveshak Neo:**\n\n"
+        header = "**Anveshak Neo:**\n\n"
+        parts = [header]
+        throttle = RenderThrottle(STREAM_RENDER_INTERVAL, STREAM_RENDER_CHARS)
         with st.chat_message("assistant", avatar="🤖"):
             response = st.empty()
             with st.status("Starting Model!", expanded=False) as status:
                 st.write("Starting Model!")
                 if not get_chat_title(st.session_state.selected_chat_id):
-                    title = model.get_title(prompt)
-                    save_chat_title(st.session_state.selected_chat_id, title)
+                    # Generate the title in the background; it is saved once ready
+                    model.get_title_async(prompt, functools.partial(save_chat_title, st.session_state.selected_chat_id))
 
                 st.write("Extracting emotions from message.")
                 status.update(
                     label="Extracting emotions from message.", state="running", expanded=False
                 )
 
-                for chunk in model.reply(prompt, chat_id=st.session_state.selected_chat_id, func=save_message):
-                    status.update(
-                        label="Replying...", state="running", expanded=False
+                try:
+                    for chunk in model.reply(prompt, emotions=emotions):
+                        if len(parts) == 1:
+                            status.update(
+                                label="Replying...", state="running", expanded=False
+                            )
+                        parts.append(chunk)
+                        # Chunks carry their own spacing; re-render only when the throttle allows
+                        if throttle.due(chunk):
+                            response.markdown("".join(parts) + "▌")
+                except BaseException:
+                    # The reply failed or the script was stopped: keep the user's message anyway
+                    save_exchange(
+                        st.session_state.selected_chat_id,
+                        prompt,
+                        None,
+                        user_prompt=model.last_prompt,
+                        trajectory=model.trajectory.to_dict(),
                     )
-                    full_response += chunk + " "
-                    response.markdown(full_response + "▌")
+                    raise
 
+                full_response = "".join(parts)
                 response.markdown(full_response)
                 st.write("All done!")
                 status.update(
                     label="All done!", state="complete", expanded=False
                 )
 
-        # Save AI response to the database
-        save_message(st.session_state.selected_chat_id, "assistant", full_response.replace(header, ""))
+        # Save the user message and AI response to the database in one transaction
+        save_exchange(
+            st.session_state.selected_chat_id,
+            prompt,
+            full_response[len(header):],
+            user_prompt=model.last_prompt,
+            trajectory=model.trajectory.to_dict(),
+        )
         st.rerun()
 else:
     st.write("Please select a chat session from the sidebar or create a new one.")
@@ -1,63 +1,139 @@
+import hashlib
+import argparse
+from pathlib import Path
+
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from transformers import BertTokenizer, BertForSequenceClassification, Trainer, TrainingArguments
-from datasets import Dataset
-import torch
-
-# Load your dataset
-df = pd.read_csv('models/dataset/emotion_dataset_raw.csv')
-
-# Encode labels
-label2id = {label: i for i, label in enumerate(df['Emotion'].unique())}
-id2label = {i: label for label, i in label2id.items()}
-df['label'] = df['Emotion'].map(label2id)
-
-# Split the dataset
-train_texts, test_texts, train_labels, test_labels = train_test_split(
-    df['Text'].tolist(), df['label'].tolist(), test_size=0.2, random_state=42
-)
-
-# Tokenizer
-tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-
-def tokenize_function(examples):
-    return tokenizer(examples['text'], padding='max_length', truncation=True)
-
-# Prepare dataset
-train_dataset = Dataset.from_dict({'text': train_texts, 'label': train_labels})
-test_dataset = Dataset.from_dict({'text': test_texts, 'label': test_labels})
-
-train_dataset = train_dataset.map(tokenize_function, batched=True)
-test_dataset = test_dataset.map(tokenize_function, batched=True)
-
-train_dataset.set_format(type='torch', columns=['input_ids', 'attention_mask', 'label'])
-test_dataset.set_format(type='torch', columns=['input_ids', 'attention_mask', 'label'])
-
-# Load pre-trained BERT model
-model = BertForSequenceClassification.from_pretrained(
-    'bert-base-uncased', num_labels=len(label2id), id2label=id2label, label2id=label2id
-)
-
-# Training
-training_args = TrainingArguments(
-    output_dir='./results',
-    evaluation_strategy='epoch',
-    per_device_train_batch_size=8,
-    per_device_eval_batch_size=8,
-    num_train_epochs=3,
-    logging_dir='./logs',
-    logging_steps=10,
-)
-
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_dataset,
-    eval_dataset=test_dataset,
-)
-
-trainer.train()
-
-# Evaluate
-results = trainer.evaluate()
-print(results)
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, DataCollatorWithPadding, Trainer, TrainingArguments
+from datasets import Dataset, DatasetDict, load_from_disk
+
+def file_hash(filepath):
+    """Returns the SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def tokenizer_hash(tokenizer, max_length):
+    """Identifies a tokenizer configuration: its name, vocabulary and truncation length."""
+    vocab = sorted(tokenizer.get_vocab().items())
+    return hashlib.sha256(repr((tokenizer.name_or_path, type(tokenizer).__name__, vocab, max_length)).encode()).hexdigest()
+
+def load_labels(df):
+    """Encodes the emotion labels as ids."""
+    label2id = {label: i for i, label in enumerate(df['Emotion'].unique())}
+    id2label = {i: label for label, i in label2id.items()}
+    df['label'] = df['Emotion'].map(label2id)
+    return df, label2id, id2label
+
+def tokenize_dataset(df, tokenizer, max_length):
+    """
+    Splits and tokenizes the dataset.
+
+    Texts are truncated but not padded: the collator pads every batch to its longest member,
+    and the `length` column lets the trainer group samples of similar length into batches.
+    """
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        df['Text'].tolist(), df['label'].tolist(), test_size=0.2, random_state=42
+    )
+
+    def tokenize_function(examples):
+        encoded = tokenizer(examples['text'], truncation=True, max_length=max_length)
+        encoded['length'] = [len(ids) for ids in encoded['input_ids']]
+        return encoded
+
+    dataset = DatasetDict({
+        'train': Dataset.from_dict({'text': train_texts, 'label': train_labels}),
+        'test': Dataset.from_dict({'text': test_texts, 'label': test_labels}),
+    })
+    return dataset.map(tokenize_function, batched=True, remove_columns=['text'])
+
+def load_or_tokenize(dataset_path, df, tokenizer, max_length, cache_dir=None):
+    """
+    Returns the tokenized dataset, reusing the copy cached on disk for the same dataset file and tokenizer.
+
+    Args:
+        dataset_path (str): Dataset CSV file, hashed into the cache key.
+        df (pd.DataFrame): The dataset with encoded labels.
+        tokenizer: Tokenizer, hashed into the cache key.
+        max_length (int): Truncation length, part of the cache key.
+        cache_dir (str, optional): Cache directory; `None` disables the cache.
+    """
+    if not cache_dir:
+        return tokenize_dataset(df, tokenizer, max_length)
+
+    key = hashlib.sha256((file_hash(dataset_path) + tokenizer_hash(tokenizer, max_length)).encode()).hexdigest()[:16]
+    cached = Path(cache_dir) / key
+    if cached.exists():
+        print(f"Using cached tokenized dataset {cached}")
+        return load_from_disk(str(cached))
+
+    dataset = tokenize_dataset(df, tokenizer, max_length)
+    dataset.save_to_disk(str(cached))
+    return dataset
+
+# Main Execution
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fine-tune a transformer emotion classifier.")
+    parser.add_argument("--dataset", default="models/dataset/emotion_dataset_raw.csv", help="Dataset CSV file.")
+    parser.add_argument("--model-name", default="bert-base-uncased", help="Pre-trained model to fine-tune.")
+    parser.add_argument("--output", default="models/bert-emotion", help="Directory the fine-tuned model is saved to.")
+    parser.add_argument("--max-length", type=int, default=128, help="Tokens kept per text.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Per-device batch size.")
+    parser.add_argument("--grad-accum", type=int, default=1, help="Gradient accumulation steps (effective batch = batch size x steps).")
+    parser.add_argument("--epochs", type=float, default=3, help="Training epochs.")
+    parser.add_argument("--learning-rate", type=float, default=5e-5)
+    parser.add_argument("--cache-dir", default=".cache/train-v2", help="Cache of tokenized datasets, keyed by dataset and tokenizer hash.")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache.")
+    args = parser.parse_args()
+
+    # Load your dataset
+    df = pd.read_csv(args.dataset)
+    df, label2id, id2label = load_labels(df)
+
+    # Tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.model_name)
+    dataset = load_or_tokenize(args.dataset, df, tokenizer, args.max_length, None if args.no_cache else args.cache_dir)
+
+    # Load pre-trained model
+    model = AutoModelForSequenceClassification.from_pretrained(
+        args.model_name, num_labels=len(label2id), id2label=id2label, label2id=label2id
+    )
+
+    # Training
+    training_args = TrainingArguments(
+        output_dir='./results',
+        eval_strategy='epoch',
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=args.batch_size * 2,
+        gradient_accumulation_steps=args.grad_accum,
+        learning_rate=args.learning_rate,
+        num_train_epochs=args.epochs,
+        group_by_length=True,
+        length_column_name='length',
+        logging_dir='./logs',
+        logging_steps=10,
+    )
+
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=dataset['train'],
+        eval_dataset=dataset['test'],
+        data_collator=DataCollatorWithPadding(tokenizer),
+    )
+
+    train_result = trainer.train()
+
+    # Evaluate
+    results = trainer.evaluate()
+    print(results)
+
+    print(f"Training throughput: {train_result.metrics['train_samples_per_second']:.1f} samples/sec")
+    print(f"Evaluation throughput: {results['eval_samples_per_second']:.1f} samples/sec")
+
+    # Save the fine-tuned model and tokenizer for `export_model.py --format onnx`
+    trainer.save_model(args.output)
+    tokenizer.save_pretrained(args.output)
+    print(f"Model saved successfully to '{args.output}'")
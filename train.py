@@ -1,7 +1,12 @@
+import sys
 import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
+import joblib
 import pandas as pd
-import neattext.functions as nfx
 
 from lightgbm import LGBMClassifier
 
@@ -10,35 +15,22 @@ from sklearn.pipeline import Pipeline
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 
-import re
 import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 
-# Download required NLTK datasets
-nltk.download('wordnet')
-nltk.download('stopwords')
+# Make the application packages (core, database) importable from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "app"))
 
-# Initialize text processing tools
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
+from export_model import export_compiled
+from core import preprocessing
+from core.preprocessing import build_lemma_table, save_lemmas, tokenize
 
-def clean_text(text):
-    """
-    Cleans and preprocesses the input text by:
-    - Converting to lowercase
-    - Removing URLs
-    - Removing punctuation and numbers
-    - Lemmatizing words and removing stopwords
-    """
-    text = text.lower()  # Convert to lowercase
-    text = re.sub(r'http\\S+|www\\S+', '', text)  # Remove URLs
-    text = re.sub(r'[^a-zA-Z]', ' ', text)  # Remove punctuation and numbers
-    text = ' '.join([lemmatizer.lemmatize(word) for word in text.split() if word not in stop_words])  # Lemmatization
-    return text
+def tokenize_texts(texts):
+    """Tokenizes a chunk of texts; runs in the preprocessing worker processes."""
+    return [tokenize(text) for text in texts]
 
 # Load Dataset
 def load_dataset(filepath):
@@ -46,12 +38,79 @@ def load_dataset(filepath):
     df = pd.read_csv(filepath)
     return df
 
+def dataset_hash(filepath):
+    """Returns the SHA-256 of the dataset file, used to key the on-disk preprocessing cache."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def preprocessing_hash():
+    """
+    Returns a SHA-256 of the cleaning code (`core/preprocessing.py`) and the NLTK version building the lemma table.
+
+    Part of the preprocessing cache key, so a change to stopwords, regexes or lemma rules never reuses a stale corpus.
+    """
+    digest = hashlib.sha256(Path(preprocessing.__file__).read_bytes())
+    digest.update(nltk.__version__.encode())
+    return digest.hexdigest()
+
 # Preprocess Text Data
-def preprocess_text(df):
-    """Cleans the text data by removing user handles and applying text cleaning functions."""
-    df['Clean_Text'] = df['Text'].apply(nfx.remove_userhandles)
-    df['Clean_Text'] = df['Clean_Text'].apply(clean_text)
-    return df
+def preprocess_text(df, jobs=None, chunk_size=2000):
+    """
+    Cleans the text data with `core.preprocessing`, the same cleaning the app applies before scoring.
+
+    Texts are tokenized in chunks across a process pool. Every distinct token is then lemmatized
+    once with WordNet, and the resulting lemma table is what the app uses at serving time.
+
+    Args:
+        df (pd.DataFrame): Dataset with a `Text` column.
+        jobs (int, optional): Worker processes; `1` tokenizes in this process. Defaults to the CPU count.
+        chunk_size (int, optional): Texts per work item. Defaults to 2000.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: The dataset with a `Clean_Text` column, and the lemma table.
+    """
+    texts = df['Text'].tolist()
+    if jobs == 1:
+        tokens = tokenize_texts(texts)
+    else:
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            tokens = [words for chunk in pool.map(tokenize_texts, chunks) for words in chunk]
+
+    # WordNet is only needed here; the app reads the lemma table instead
+    nltk.download('wordnet', quiet=True)
+    lemmas = build_lemma_table({word for words in tokens for word in words})
+    df['Clean_Text'] = [' '.join([lemmas.get(word, word) for word in words]) for words in tokens]
+    return df, lemmas
+
+def load_or_preprocess(filepath, cache_dir=None, jobs=None):
+    """
+    Loads the dataset and its cleaned texts, reusing the cleaned corpus cached for the same dataset file
+    and preprocessing code.
+
+    Args:
+        filepath (str): Dataset CSV file.
+        cache_dir (str, optional): Cache directory; `None` disables the cache.
+        jobs (int, optional): Preprocessing worker processes.
+
+    Returns:
+        tuple[pd.DataFrame, dict, str]: The preprocessed dataset, the lemma table and the cache key
+        (a hash of the dataset and the preprocessing code).
+    """
+    key = hashlib.sha256((dataset_hash(filepath) + preprocessing_hash()).encode()).hexdigest()
+    cached = Path(cache_dir) / f"{key[:16]}-clean.joblib" if cache_dir else None
+    if cached is not None and cached.exists():
+        print(f"Using cached preprocessed dataset {cached}")
+        return (*joblib.load(cached), key)
+
+    df, lemmas = preprocess_text(load_dataset(filepath), jobs=jobs)
+    if cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump((df, lemmas), cached)
+    return df, lemmas, key
 
 # Split Data
 def split_data(df):
@@ -60,26 +119,113 @@ def split_data(df):
     y = df['Emotion']
     return train_test_split(x, y, test_size=0.3, random_state=42)
 
+# Candidate models: TF-IDF configuration and classifier step. Candidates sharing a TF-IDF
+# configuration share one fitted vectorizer.
+MODELS = {
+    'Logistic Regression': ({}, ('lr', LogisticRegression(max_iter=10000, solver='saga'))),
+    'SVM': ({}, ('svc', SVC(kernel='rbf', C=10, probability=True))),
+    'Random Forest': ({}, ('rf', RandomForestClassifier(n_estimators=10))),
+    'Naive Bayes': ({}, ('nb', MultinomialNB())),
+    'LightGBM': ({'ngram_range': (1, 2)}, ('lgbm', LGBMClassifier())),
+}
+
+# Hyperparameter grids searched with --search
+PARAM_GRIDS = {
+    'Logistic Regression': {'C': [0.3, 1, 3, 10]},
+    'Naive Bayes': {'alpha': [0.01, 0.1, 0.5, 1.0]},
+    'Random Forest': {'n_estimators': [10, 50, 100]},
+}
+
+def vectorize(x_train, x_test, tfidf_params, cache_key=None, cache_dir=None):
+    """
+    Fits a TF-IDF vectorizer on the training texts and transforms both splits, using the on-disk cache when possible.
+
+    Returns:
+        tuple: The fitted vectorizer and the training and testing matrices.
+    """
+    name = hashlib.sha256(repr((cache_key, sorted(tfidf_params.items()))).encode()).hexdigest()[:16]
+    cached = Path(cache_dir) / f"{name}-tfidf.joblib" if cache_dir and cache_key else None
+    if cached is not None and cached.exists():
+        print(f"Using cached TF-IDF matrices {cached}")
+        return joblib.load(cached)
+
+    vectorizer = TfidfVectorizer(**tfidf_params)
+    matrices = (vectorizer, vectorizer.fit_transform(x_train), vectorizer.transform(x_test))
+    if cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(matrices, cached)
+    return matrices
+
+def fit_candidate(name, estimator, x_train, y_train, x_test, y_test):
+    """Fits one classifier on TF-IDF features and scores it."""
+    estimator.fit(x_train, y_train)
+    return name, estimator, estimator.score(x_test, y_test)
+
+def search_candidate(name, pipeline, x_train, y_train, x_test, y_test):
+    """
+    Grid-searches a TF-IDF + classifier pipeline on the cleaned training texts and scores the best one.
+
+    The vectorizer is part of the searched pipeline, so every fold fits TF-IDF on its own training
+    part and no vocabulary or IDF statistics leak from the validation fold into the scores.
+    """
+    step = pipeline.steps[-1][0]
+    grid = GridSearchCV(pipeline, {f"{step}__{k}": v for k, v in PARAM_GRIDS[name].items()}, cv=3, n_jobs=1)
+    grid.fit(x_train, y_train)
+    print(f"{name} best parameters: {grid.best_params_}")
+    return name, grid.best_estimator_, grid.best_estimator_.score(x_test, y_test)
+
 # Train and Evaluate Model
-def train_and_evaluate_model(x_train, x_test, y_train, y_test):
+def train_and_evaluate_model(x_train, x_test, y_train, y_test, names=None, jobs=None, search=False, cache_key=None, cache_dir=None):
     """
     Trains multiple machine learning models and evaluates their accuracy.
     Returns trained models and their respective scores.
+
+    Each TF-IDF configuration is fitted once and shared by its candidates, which are then
+    trained concurrently in separate processes. Searched candidates fit TF-IDF inside the
+    search instead (see `search_candidate`).
+
+    Args:
+        names (list[str], optional): Candidates to train. Defaults to every entry of `MODELS`.
+        jobs (int, optional): Candidates trained at once. Defaults to the CPU count.
+        search (bool, optional): Run a cross-validated grid search for candidates in `PARAM_GRIDS`.
+        cache_key (str, optional): Key of the preprocessed dataset (see `load_or_preprocess`), keying the TF-IDF cache.
+        cache_dir (str, optional): Cache directory; `None` disables the cache.
     """
-    models = {
-        'Logistic Regression': Pipeline([('tfidf', TfidfVectorizer()), ('lr', LogisticRegression(max_iter=10000, solver='saga'))]),
-        'SVM': Pipeline([('tfidf', TfidfVectorizer()), ('svc', SVC(kernel='rbf', C=10, probability=True))]),
-        'Random Forest': Pipeline([('tfidf', TfidfVectorizer()), ('rf', RandomForestClassifier(n_estimators=10))]),
-        'Naive Bayes': Pipeline([('tfidf', TfidfVectorizer()), ('nb', MultinomialNB())]),
-        'LightGBM': Pipeline([('tfidf', TfidfVectorizer(ngram_range=(1, 2))), ('lgbm', LGBMClassifier())])
-    }
-
-    scores = {}
-    for model_name, pipeline in models.items():
-        pipeline.fit(x_train, y_train)
-        score = pipeline.score(x_test, y_test)
-        scores[model_name] = score
-        print(f"{model_name} Accuracy: {score:.2f}")
+    names = names or list(MODELS)
+    searched = {name for name in names if search and name in PARAM_GRIDS}
+    split_key = (cache_key, len(x_train), len(x_test)) if cache_key else None
+
+    features = {}
+    for name in names:
+        if name in searched:
+            continue
+        tfidf_params = MODELS[name][0]
+        key = tuple(sorted(tfidf_params.items()))
+        if key not in features:
+            features[key] = vectorize(x_train, x_test, tfidf_params, split_key, cache_dir)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for name in names:
+            tfidf_params, (step, estimator) = MODELS[name]
+            if name in searched:
+                pipeline = Pipeline([('tfidf', TfidfVectorizer(**tfidf_params)), (step, clone(estimator))])
+                futures.append(pool.submit(search_candidate, name, pipeline, x_train, y_train, x_test, y_test))
+                continue
+            _, train_matrix, test_matrix = features[tuple(sorted(tfidf_params.items()))]
+            futures.append(pool.submit(fit_candidate, name, clone(estimator), train_matrix, y_train, test_matrix, y_test))
+
+        models, scores = {}, {}
+        for future in futures:
+            name, estimator, score = future.result()
+            if name in searched:
+                models[name] = estimator  # Already the refitted pipeline
+            else:
+                tfidf_params, (step, _) = MODELS[name]
+                vectorizer = features[tuple(sorted(tfidf_params.items()))][0]
+                models[name] = Pipeline([('tfidf', vectorizer), (step, estimator)])
+            scores[name] = score
+            print(f"{name} Accuracy: {score:.2f}")
 
     return models, scores
 
@@ -89,17 +235,55 @@ def save_model(model, filename):
     with open(filename, 'wb') as file:
         pickle.dump(model, file)
 
+def save_model_joblib(model, filename):
+    """Saves the trained model as an uncompressed joblib file that can be memory-mapped at load time."""
+    joblib.dump(model, filename)
+
 # Main Execution
 if __name__ == '__main__':
-    df = load_dataset('models/dataset/emotion_dataset_raw.csv')
-    df = preprocess_text(df)
+    parser = argparse.ArgumentParser(description="Train the emotion classifier.")
+    parser.add_argument("--dataset", default="models/dataset/emotion_dataset_raw.csv", help="Dataset CSV file.")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), help="Candidates to train (default: all).")
+    parser.add_argument("--jobs", type=int, help="Worker processes for preprocessing and training (default: CPU count).")
+    parser.add_argument("--search", action="store_true", help="Cross-validated hyperparameter search for the candidates that have a grid.")
+    parser.add_argument("--cache-dir", default=".cache/train", help="Cache of cleaned texts and TF-IDF matrices, keyed by dataset and preprocessing code.")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache.")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    df, lemmas, key = load_or_preprocess(args.dataset, cache_dir=cache_dir, jobs=args.jobs)
     x_train, x_test, y_train, y_test = split_data(df)
-    models, scores = train_and_evaluate_model(x_train, x_test, y_train, y_test)
+    models, scores = train_and_evaluate_model(
+        x_train, x_test, y_train, y_test,
+        names=args.models,
+        jobs=args.jobs,
+        search=args.search,
+        cache_key=key,
+        cache_dir=cache_dir,
+    )
 
     # Save the best model (based on accuracy)
     best_model_name = max(scores, key=scores.get)
     best_model = models[best_model_name]
     print(f"Best Model: {best_model_name} with Accuracy: {scores[best_model_name]:.2f}")
 
+    # The app lemmatizes with this table, so it always ships with the model
+    save_lemmas(lemmas, 'models/lemmas.json')
+    print("Lemma table saved successfully as 'lemmas.json'")
+
     save_model(best_model, 'models/text_emotion.pkl')
     print("Model saved successfully as 'text_emotion.pkl'")
+
+    save_model_joblib(best_model, 'models/text_emotion.joblib')
+    print("Model exported successfully as 'text_emotion.joblib'")
+
+    # Compile TF-IDF + LogisticRegression/NB pipelines into the standalone NumPy scorer
+    try:
+        export_compiled(best_model, 'models/text_emotion.npz', x_test.tolist())
+        print("Model compiled successfully as 'text_emotion.npz'")
+    except ValueError as e:
+        print(f"Skipping compiled export: {e}")
+        # The app prefers the compiled scorer, so one left from an earlier run would shadow this model
+        if Path('models/text_emotion.npz').exists():
+            Path('models/text_emotion.npz').unlink()
+            print("Removed the outdated 'text_emotion.npz'")